@@ -0,0 +1,104 @@
+"""Load test of the authentication against a local fake identity provider, over the real network path."""
+
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from library_api.api.config import AuthenticationSettings, get_auth_settings
+from library_api.api.kernel import app
+from library_api.api.security import Permission
+from library_api.api.security.authentication import _get_json_web_key
+from library_api.testing.identity_provider import IdentityProviderSettings, create_app
+
+JWKS_LATENCY = 0.02
+ITERATIONS = 200
+STORM_CONCURRENCY = 16
+ENDPOINTS = ["/auth/introspection", "/loans/me", "/loans/"]
+
+
+def _free_port() -> int:
+    """Find a free TCP port on the loopback interface."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_identity_provider(port: int) -> tuple[uvicorn.Server, FastAPI, httpx.Client]:
+    """Start the fake identity provider in a background thread."""
+    identity_provider_app = create_app(IdentityProviderSettings(port=port, jwks_latency=JWKS_LATENCY))
+    server = uvicorn.Server(uvicorn.Config(identity_provider_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, identity_provider_app, httpx.Client(base_url=f"http://127.0.0.1:{port}")
+
+
+def _mint_token(identity_provider: httpx.Client) -> dict[str, str]:
+    """Mint a token with every permission and return the authorization header."""
+    response = identity_provider.post("/oauth/token", json={"permissions": list(Permission)})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _latency_ms(client: TestClient, path: str, headers: dict[str, str]) -> float:
+    """Request an endpoint and return its latency in milliseconds."""
+    start = time.perf_counter()
+    response = client.get(path, headers=headers)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.text
+    return elapsed
+
+
+def main() -> None:
+    """Print cold start, per-endpoint and rotation storm measurements."""
+    port = _free_port()
+    server, identity_provider_app, identity_provider = _start_identity_provider(port)
+    app.dependency_overrides[get_auth_settings] = lambda: AuthenticationSettings(
+        tenant_base_url=f"http://127.0.0.1:{port}"
+    )
+    client = TestClient(app)
+    headers = _mint_token(identity_provider)
+
+    cold = []
+    for _ in range(20):
+        _get_json_web_key.cache_clear()  # pyright: ignore [reportFunctionMemberAccess]
+        cold.append(_latency_ms(client, "/auth/introspection", headers))
+    print(f"cold start (JWKS fetch, {JWKS_LATENCY * 1000:.0f}ms latency): {statistics.median(cold):.2f}ms median")
+
+    print(f"{'endpoint':<22} {'median ms':>10} {'p99 ms':>10} {'unauthenticated ms':>20}")
+    for path in ENDPOINTS:
+        warm = sorted(_latency_ms(client, path, headers) for _ in range(ITERATIONS))
+        unauthenticated = []
+        for _ in range(ITERATIONS):
+            start = time.perf_counter()
+            client.get(path)
+            unauthenticated.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{path:<22} {statistics.median(warm):>10.2f} {warm[int(len(warm) * 0.99)]:>10.2f} "
+            f"{statistics.median(unauthenticated):>20.2f}"
+        )
+
+    identity_provider.post("/keys/rotate")
+    headers = _mint_token(identity_provider)
+    fetches = identity_provider_app.state.jwks_requests
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STORM_CONCURRENCY) as executor:
+        list(executor.map(lambda _: _latency_ms(client, "/auth/introspection", headers), range(STORM_CONCURRENCY)))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(
+        f"rotation storm: {STORM_CONCURRENCY} concurrent requests with a new kid took {elapsed:.2f}ms "
+        f"and fetched the JWKS {identity_provider_app.state.jwks_requests - fetches} times"
+    )
+
+    server.should_exit = True
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark of the cold start of the API: import time, startup time and first requests latency.
+
+Each measurement runs in a fresh interpreter, with its logs discarded so that its stdout only holds the results.
+The script exits with an error if the median import exceeds its budget, set about 10% above the ~453 ms measured
+once uvicorn was imported lazily: raise IMPORT_BUDGET_MS on a slower host rather than loosening the check.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 9
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "500"))
+
+_MEASUREMENT = """
+import json, sys, time, warnings
+
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+from library_api.api.kernel import app
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+
+with TestClient(app) as client:
+    started = time.perf_counter()
+    client.get("/openapi.json")
+    openapi = time.perf_counter()
+    client.get("/loans/")
+    unauthenticated = time.perf_counter()
+
+json.dump(
+    {
+        "import": (imported - start) * 1000,
+        "uvicorn imported": "uvicorn" in sys.modules,
+        "startup": (started - imported) * 1000,
+        "first /openapi.json": (openapi - started) * 1000,
+        "first /loans/ (401)": (unauthenticated - openapi) * 1000,
+    },
+    sys.stdout,
+)
+"""
+
+
+def main() -> None:
+    """Print the median cold start measurements and check the import budget."""
+    environment = {**os.environ, "LOGGING_PATH": os.devnull}
+    runs = [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-c", _MEASUREMENT], check=True, capture_output=True, env=environment
+            ).stdout
+        )
+        for _ in range(RUNS)
+    ]
+
+    for name in ["import", "startup", "first /openapi.json", "first /loans/ (401)"]:
+        print(f"{name:<22} {statistics.median(run[name] for run in runs):>8.1f} ms")
+    print(f"{'uvicorn imported':<22} {runs[0]['uvicorn imported']!s:>8}")
+
+    import_ms = statistics.median(run["import"] for run in runs)
+    if import_ms > IMPORT_BUDGET_MS:
+        sys.exit(f"Median import time {import_ms:.1f} ms exceeds the {IMPORT_BUDGET_MS:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
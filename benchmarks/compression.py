@@ -0,0 +1,67 @@
+"""Benchmark of the bytes and latency saved by compressing a large loans listing."""
+
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from library_api.api.kernel import app
+from library_api.api.repositories import fake_book_repository, fake_loan_repository
+from library_api.api.security import JWT, Permission
+from library_api.api.security.authentication import authentication
+from library_api.domain.models import Book
+
+LOANS = 5_000
+ITERATIONS = 20
+BANDWIDTH = 10_000_000 / 8  # 10 Mbit/s WAN link, in bytes per second
+
+
+def _fill_repositories() -> None:
+    """Request a loan for as many books as needed."""
+    for issue in range(LOANS):
+        book = fake_book_repository.create(
+            Book(id=uuid.uuid4(), issue=issue, isbn="978-3-16-148410-0", title="Book", author="Author")
+        )
+        fake_loan_repository.request(book.id, f"auth0|{issue:024d}")
+
+
+def _authenticated() -> JWT:
+    """Authenticate every request as an administrator."""
+    now = datetime.now(tz=timezone.utc)
+    return JWT(
+        issuer="https://fabien-sh.eu.auth0.com/",
+        subject="auth0|e653d123e9687d9c90d11d92",
+        audience="library-api",
+        issued_at=now,
+        expires_at=now + timedelta(hours=1),
+        authorized_party="SL49RJ9JLIIGyKS139tyGbWPAZpwrw",
+        permissions=set(Permission),
+    )
+
+
+def main() -> None:
+    """Print the response size, server latency and estimated WAN transfer time per encoding."""
+    _fill_repositories()
+    app.dependency_overrides[authentication] = _authenticated
+    client = TestClient(app)
+
+    print(f"GET /loans/ with {LOANS} loans, transfer estimated on a {BANDWIDTH * 8 / 1e6:.0f} Mbit/s link")
+    print(f"{'encoding':<10} {'bytes':>10} {'server ms':>10} {'transfer ms':>12} {'total ms':>10}")
+    for encoding in ["identity", "gzip", "zstd"]:
+        latencies, size = [], 0
+        for _ in range(ITERATIONS):
+            start = time.perf_counter()
+            response = client.get("/loans/", headers={"Accept-Encoding": encoding})
+            latencies.append((time.perf_counter() - start) * 1000)
+            size = response.num_bytes_downloaded
+        server = statistics.median(latencies)
+        transfer = size / BANDWIDTH * 1000
+        print(f"{encoding:<10} {size:>10} {server:>10.2f} {transfer:>12.2f} {server + transfer:>10.2f}")
+
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
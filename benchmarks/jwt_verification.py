@@ -0,0 +1,54 @@
+"""Benchmark of the JWT verification throughput per signing algorithm."""
+
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import jwt as pyjwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
+from jwt import PyJWK
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+
+ITERATIONS = 2_000
+
+
+def _keys() -> dict[str, tuple[PrivateKeyTypes, PyJWK]]:
+    """Generate a private key and its public verifier for each algorithm."""
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed25519_key = ed25519.Ed25519PrivateKey.generate()
+
+    return {
+        "RS256": (rsa_key, PyJWK(RSAAlgorithm.to_jwk(rsa_key.public_key(), as_dict=True))),
+        "ES256": (ec_key, PyJWK(ECAlgorithm.to_jwk(ec_key.public_key(), as_dict=True))),
+        "EdDSA": (ed25519_key, PyJWK(OKPAlgorithm.to_jwk(ed25519_key.public_key(), as_dict=True))),
+    }
+
+
+def main() -> None:
+    """Print the token size and the verification throughput for each algorithm."""
+    now = datetime.now(tz=timezone.utc)
+    payload = {
+        "iss": "https://fabien-sh.eu.auth0.com/",
+        "sub": "auth0|e653d123e9687d9c90d11d92",
+        "aud": "library-api",
+        "iat": int(now.timestamp()),
+        "exp": int((now + timedelta(hours=1)).timestamp()),
+        "permissions": ["loan:read", "loan:request"],
+    }
+
+    print(f"{'algorithm':<10} {'token bytes':>12} {'verify/s':>12} {'µs/verify':>12}")
+    for algorithm, (private_key, json_web_key) in _keys().items():
+        raw_jwt = pyjwt.encode(payload, key=private_key, algorithm=algorithm)  # pyright: ignore [reportArgumentType]
+
+        def verify(raw_jwt: str = raw_jwt, json_web_key: PyJWK = json_web_key) -> None:
+            pyjwt.decode(
+                raw_jwt, key=json_web_key.key, audience="library-api", algorithms=[json_web_key.algorithm_name]
+            )
+
+        elapsed = timeit.timeit(verify, number=ITERATIONS)
+        print(f"{algorithm:<10} {len(raw_jwt):>12} {ITERATIONS / elapsed:>12.0f} {elapsed / ITERATIONS * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
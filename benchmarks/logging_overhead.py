@@ -0,0 +1,101 @@
+"""Benchmark of the access and audit logs overhead per request."""
+
+import logging
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator
+
+from fastapi.testclient import TestClient
+
+from library_api.api.config import LoggingSettings
+from library_api.api.kernel import app
+from library_api.api.logs import JsonFormatter, access_logger, logging_pipeline
+from library_api.api.security import JWT, Permission
+from library_api.api.security.authentication import authentication
+
+ITERATIONS = 2_000
+
+
+def _authenticated() -> JWT:
+    """Authenticate every request as an administrator."""
+    now = datetime.now(tz=timezone.utc)
+    return JWT(
+        issuer="https://fabien-sh.eu.auth0.com/",
+        subject="auth0|e653d123e9687d9c90d11d92",
+        audience="library-api",
+        issued_at=now,
+        expires_at=now + timedelta(hours=1),
+        authorized_party="SL49RJ9JLIIGyKS139tyGbWPAZpwrw",
+        permissions=set(Permission),
+    )
+
+
+@contextmanager
+def _no_logs(_: Path) -> Iterator[None]:
+    """Disable the logs."""
+    yield
+
+
+@contextmanager
+def _synchronous_logs(path: Path) -> Iterator[None]:
+    """Write the logs to a file from the request handling thread."""
+    handler = logging.FileHandler(path)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("library_api")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    yield
+    logger.removeHandler(handler)
+    logger.setLevel(logging.NOTSET)
+    handler.close()
+
+
+@contextmanager
+def _queued_logs(path: Path) -> Iterator[None]:
+    """Write the logs to a file from the background thread."""
+    with logging_pipeline(LoggingSettings(path=str(path))):
+        yield
+
+
+def main() -> None:
+    """Print the cost of a log record and the median and p99 latency of a request for each logging setup."""
+    app.dependency_overrides[authentication] = _authenticated
+    client = TestClient(app)
+    setups: dict[str, Callable[[Path], ContextManager[None]]] = {
+        "no logs": _no_logs,
+        "synchronous": _synchronous_logs,
+        "queued": _queued_logs,
+    }
+
+    for _ in range(200):
+        client.get("/loans/me")
+
+    print(f"{'logs':<12} {'µs/record':>10} {'median µs':>10} {'p99 µs':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, setup in setups.items():
+            latencies = []
+            with setup(Path(directory) / f"{name}.log"):
+                start = time.perf_counter()
+                for _ in range(ITERATIONS):
+                    access_logger.info("GET /loans/me 200", extra={"fields": {"status": 200}})
+                per_record = (time.perf_counter() - start) / ITERATIONS * 1e6
+
+                for _ in range(ITERATIONS):
+                    start = time.perf_counter()
+                    client.get("/loans/me")
+                    latencies.append((time.perf_counter() - start) * 1e6)
+            latencies.sort()
+            print(
+                f"{name:<12} {per_record:>10.1f} {statistics.median(latencies):>10.0f} "
+                f"{latencies[int(len(latencies) * 0.99)]:>10.0f}"
+            )
+
+    app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Group commit of the loan mutations."""
+
+import asyncio
+import contextvars
+
+from library_api.domain.models import Loan, LoanMutation
+from library_api.domain.repositories import LoanRepository
+
+
+class LoanWriteBatcher:
+    """Coalesce the loan mutations arriving within a time window, or up to a batch size, into a single commit.
+
+    Mutations are committed in their arrival order, one batch after the other, so the repository rules
+    (e.g. one active loan per book) are checked as if the mutations were committed one by one.
+    Commits run in a worker thread, one at a time: the event loop keeps serving requests meanwhile, and the
+    mutations submitted during a commit form the next batch.
+    Each caller gets the result of its own mutation once its batch is committed, and the repository listeners
+    are notified of it in the context of its caller.
+    """
+
+    def __init__(self, loan_repository: LoanRepository, window: float, max_size: int) -> None:
+        """Initialize the batcher with the window in seconds and the maximum size of a batch."""
+        self.loan_repository = loan_repository
+        self.window = window
+        self.max_size = max_size
+        self._pending: list[tuple[LoanMutation, contextvars.Context, asyncio.Future[Loan]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._committing: asyncio.Task[None] | None = None
+
+    async def submit(self, mutation: LoanMutation) -> Loan:
+        """Submit a mutation and wait for its batch to be committed."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Loan] = loop.create_future()
+        self._pending.append((mutation, contextvars.copy_context(), future))
+
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """Commit the pending mutations, right away or once the commit in flight is done."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._pending and (self._committing is None or self._committing.done()):
+            self._committing = asyncio.get_running_loop().create_task(self._commit_pending())
+
+    async def drain(self) -> None:
+        """Commit the pending mutations and wait for every commit to be done, e.g. before shutting down."""
+        self.flush()
+        if self._committing is not None:
+            await self._committing
+
+    async def _commit_pending(self) -> None:
+        """Commit the pending mutations batch after batch, until none is left."""
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_size], self._pending[self.max_size :]
+            if not self._pending and self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            try:
+                results = await asyncio.to_thread(self.loan_repository.commit, [mutation for mutation, _, _ in batch])
+            except Exception as error:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            for (_, context, future), result in zip(batch, results, strict=True):
+                if isinstance(result, Loan):
+                    context.run(self.loan_repository.notify, result)
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
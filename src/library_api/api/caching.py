@@ -1,15 +1,242 @@
 """Cache-related utilities."""
 
-from typing import Any
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Annotated, Any, Callable, Iterator
 
 from cachetools.keys import hashkey, typedkey
+from fastapi import Depends
 
+from library_api.api.config import SharedCacheSettings, get_shared_cache_settings
 
-def key_id_hashkey(*_: Any, kid: str | None = None, **__: Any) -> tuple:  # pylint: disable=unused-argument # noqa: ANN002,ANN401
-    """Hit the cache for a given key ID and ignore other args & kwargs."""
-    return typedkey(kid)
+
+def key_id_hashkey(*_: Any, kid: str | None = None, version: int = 0, **__: Any) -> tuple:  # pylint: disable=unused-argument # noqa: ANN002,ANN401
+    """Hit the cache for a given key ID and shared cache version and ignore other args & kwargs."""
+    return typedkey(kid, version)
 
 
 def ignore_args_hashkey(*_: Any, **__: Any) -> tuple:  # pylint: disable=unused-argument # noqa: ANN002,ANN401
     """Hit the cache even if the function arguments are different."""
     return hashkey("_")
+
+
+class SharedCache:
+    """Cache shared by every worker of a host, backed by a local SQLite file.
+
+    Values must be JSON-serializable. Entries are bound to a cache-wide version:
+    bumping it invalidates the entries of every worker at once.
+
+    The file must be owned by the current user and not accessible to others, in a directory others cannot write
+    into (e.g. `/dev/shm/library-api/`), since the values read back from it are trusted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_duration: float = 10.0,
+        poll_interval: float = 0.01,
+        eviction_interval: int = 1000,
+    ) -> None:
+        """Initialize the cache, creating its file readable by the owner only.
+
+        A value is computed by one worker at a time for at most `lease_duration` seconds, the others check
+        for it every `poll_interval` seconds. Expired entries are evicted every `eviction_interval` writes.
+        """
+        self.path = path
+        self.lease_duration = lease_duration
+        self.poll_interval = poll_interval
+        self.eviction_interval = eviction_interval
+        self._check_private(path)
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT, version INTEGER, value TEXT, stored_at REAL, expires_at REAL, PRIMARY KEY (key, version))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires_at REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('version', 0)")
+
+    @staticmethod
+    def _check_private(path: str) -> None:
+        """Create the cache file if needed and check neither it nor its directory can be tampered with by others.
+
+        SQLite creates its `-wal` and `-shm` files next to the cache file, hence the check of the directory.
+        """
+        directory = os.stat(os.path.dirname(os.path.abspath(path)))
+        if directory.st_uid != os.getuid() or directory.st_mode & 0o022:
+            msg = f"The directory of the shared cache '{path}' must be owned and only writable by the current user."
+            raise PermissionError(msg)
+
+        descriptor = os.open(path, os.O_CREAT | os.O_RDWR | os.O_NOFOLLOW, 0o600)
+        try:
+            file = os.fstat(descriptor)
+        finally:
+            os.close(descriptor)
+        if file.st_uid != os.getuid() or file.st_mode & 0o077:
+            msg = f"The shared cache '{path}' must be owned and only accessible by the current user."
+            raise PermissionError(msg)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Get the connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Open a transaction holding the write lock of the cache across processes.
+
+        The lock blocks the writes of every worker of the host: nothing slow may run while it is held.
+        """
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def version(self) -> int:
+        """Get the current version of the cache."""
+        return self._connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()[0]
+
+    def get(self, key: str) -> Any | None:  # noqa: ANN401
+        """Get a value from the current version of the cache."""
+        return self._get(self._connection, key)[0]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:  # noqa: ANN401
+        """Store a value in the current version of the cache for `ttl` seconds."""
+        with self._transaction() as connection:
+            self._set(connection, key, value, ttl)
+        self._evict_periodically()
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: float) -> Any:  # noqa: ANN401
+        """Get a value or compute it, only once per host if several workers miss it concurrently."""
+        return self._compute_once(key, factory, ttl, is_fresh=lambda value, _: value is not None)
+
+    def refresh(self, key: str, factory: Callable[[], Any], ttl: float, min_interval: float) -> Any:  # noqa: ANN401
+        """Recompute a value and bump the cache version if it changed.
+
+        A value stored less than `min_interval` seconds ago is returned as is, so a burst of refreshes
+        from every worker results in a single computation.
+        """
+        return self._compute_once(
+            key,
+            factory,
+            ttl,
+            is_fresh=lambda value, stored_at: value is not None and time.time() - stored_at < min_interval,
+            bump_version_on_change=True,
+        )
+
+    def bump_version(self) -> None:
+        """Invalidate every entry of the cache."""
+        with self._transaction() as connection:
+            connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+            connection.execute("DELETE FROM entries")
+
+    def evict(self) -> None:
+        """Evict the expired entries."""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+
+    def _evict_periodically(self) -> None:
+        """Evict the expired entries every `eviction_interval` writes of this worker."""
+        if next(self._writes) % self.eviction_interval == 0:
+            self.evict()
+
+    def _compute_once(
+        self,
+        key: str,
+        factory: Callable[[], Any],
+        ttl: float,
+        is_fresh: Callable[[Any | None, float], bool],
+        bump_version_on_change: bool = False,
+    ) -> Any:  # noqa: ANN401
+        """Return the value if fresh, or compute it while the workers missing it concurrently wait for it.
+
+        The computation runs under a lease rather than the write lock, so the other writes of the host go on.
+        A lease left by a crashed worker expires after `lease_duration` seconds.
+        """
+        while True:
+            value, stored_at = self._get(self._connection, key)
+            if is_fresh(value, stored_at):
+                return value
+            if self._acquire_lease(key):
+                break
+            time.sleep(self.poll_interval)
+
+        try:
+            computed = factory()
+        except BaseException:
+            with self._transaction() as connection:
+                connection.execute("DELETE FROM leases WHERE key = ?", (key,))
+            raise
+
+        with self._transaction() as connection:
+            current, _ = self._get(connection, key)
+            if bump_version_on_change and computed != current:
+                connection.execute("UPDATE meta SET value = value + 1 WHERE name = 'version'")
+                connection.execute(
+                    "DELETE FROM entries WHERE version < (SELECT value FROM meta WHERE name = 'version')"
+                )
+            self._set(connection, key, computed, ttl)
+            connection.execute("DELETE FROM leases WHERE key = ?", (key,))
+        self._evict_periodically()
+        return computed
+
+    def _acquire_lease(self, key: str) -> bool:
+        """Acquire the lease to compute a value, unless another worker holds it."""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)", (key, now + self.lease_duration)
+            )
+            return cursor.rowcount == 1
+
+    @staticmethod
+    def _get(connection: sqlite3.Connection, key: str) -> tuple[Any | None, float]:
+        """Get a value and the time it was stored at."""
+        row = connection.execute(
+            "SELECT value, stored_at FROM entries "
+            "WHERE key = ? AND version = (SELECT value FROM meta WHERE name = 'version') AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None, 0
+        return json.loads(row[0]), row[1]
+
+    @staticmethod
+    def _set(connection: sqlite3.Connection, key: str, value: Any, ttl: float) -> None:  # noqa: ANN401
+        """Store a value."""
+        now = time.time()
+        connection.execute(
+            "INSERT OR REPLACE INTO entries (key, version, value, stored_at, expires_at) "
+            "VALUES (?, (SELECT value FROM meta WHERE name = 'version'), ?, ?, ?)",
+            (key, json.dumps(value), now, now + ttl),
+        )
+
+
+@lru_cache
+def get_shared_cache(
+    shared_cache_settings: Annotated[SharedCacheSettings, Depends(get_shared_cache_settings)],
+) -> SharedCache | None:
+    """Get the cache shared by the workers of the host, if enabled."""
+    if shared_cache_settings.path is None:
+        return None
+    return SharedCache(shared_cache_settings.path)
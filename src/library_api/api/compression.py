@@ -0,0 +1,193 @@
+"""Negotiated compression of the HTTP responses."""
+
+import importlib.util
+import zlib
+from functools import cache
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+@cache
+def _zstd_available() -> bool:
+    """Check whether the optional zstandard package is installed, without importing it."""
+    return importlib.util.find_spec("zstandard") is not None
+
+
+class _Compressor(Protocol):
+    """Incremental compressor of a response body."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk of data."""
+        ...
+
+    def flush(self, last: bool) -> bytes:
+        """Flush the compressed data, ending the stream on the last chunk."""
+        ...
+
+
+class _GzipCompressor:
+    """Incremental gzip compressor."""
+
+    def __init__(self, level: int) -> None:
+        """Initialize a gzip stream."""
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk of data."""
+        return self._compressor.compress(data)
+
+    def flush(self, last: bool) -> bytes:
+        """Flush the compressed data, ending the stream on the last chunk."""
+        return self._compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _ZstdCompressor:
+    """Incremental zstd compressor."""
+
+    def __init__(self, level: int) -> None:
+        """Initialize a zstd stream."""
+        import zstandard  # imported lazily: only needed once a client negotiates zstd
+
+        self._zstandard = zstandard
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk of data."""
+        return self._compressor.compress(data)
+
+    def flush(self, last: bool) -> bytes:
+        """Flush the compressed data, ending the stream on the last chunk."""
+        return self._compressor.flush(
+            self._zstandard.COMPRESSOBJ_FLUSH_FINISH if last else self._zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Pick the preferred supported encoding of an `Accept-Encoding` header, zstd first on equal quality."""
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, parameters = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = parameters.strip().partition("=")
+        if name == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip()] = quality
+
+    supported = ["zstd", "gzip"] if _zstd_available() else ["gzip"]
+    candidates = [
+        (qualities.get(encoding, qualities.get("*", 0.0)), -rank, encoding) for rank, encoding in enumerate(supported)
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """Compress the responses with gzip or zstd, as negotiated with the client.
+
+    Responses smaller than `minimum_size`, authentication errors and responses of excluded paths are sent as is.
+    Streamed responses are compressed and flushed chunk by chunk rather than buffered.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        gzip_level: int,
+        zstd_level: int,
+        excluded_paths: tuple[str, ...] = (),
+        excluded_statuses: frozenset[int] = frozenset({401, 403}),
+    ) -> None:
+        """Initialize the middleware."""
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.excluded_paths = excluded_paths
+        self.excluded_statuses = excluded_statuses
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Compress the response if negotiated."""
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressionResponder(self, encoding, send)(scope, receive)
+
+
+class _CompressionResponder:
+    """Compress the messages of a single response."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        """Initialize the responder."""
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Message | None = None
+        self.compressor: _Compressor | None = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive) -> None:
+        """Run the application, compressing its response."""
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    def _compressor(self) -> _Compressor:
+        """Create the compressor of the negotiated encoding."""
+        if self.encoding == "zstd":
+            return _ZstdCompressor(self.middleware.zstd_level)
+        return _GzipCompressor(self.middleware.gzip_level)
+
+    async def send_compressed(self, message: Message) -> None:
+        """Compress a response message."""
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = message["status"] in self.middleware.excluded_statuses or "content-encoding" in headers
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            self.compressor = self._compressor()
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.flush(last=True)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+            await self.send(start_message)
+
+        assert self.compressor is not None
+        body = self.compressor.compress(body) + self.compressor.flush(last=not more_body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
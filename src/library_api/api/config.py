@@ -1,11 +1,13 @@
 """Configuration for the Library API application."""
 
+from datetime import timedelta
 from functools import lru_cache
-from typing import Annotated
+from typing import Annotated, Literal
 
 import httpx
 from fastapi.params import Depends
 from fastapi.security import OAuth2AuthorizationCodeBearer, OAuth2
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -18,6 +20,7 @@ class AuthenticationSettings(BaseSettings):
     audience: str = "library-api"
 
     jwks_path: str = "/.well-known/jwks.json"
+    algorithms: tuple[str, ...] = ("RS256", "ES256", "EdDSA")
 
     authorization_path: str = "/authorize"
     token_path: str = "/oauth/token"
@@ -50,3 +53,95 @@ def oauth() -> OAuth2:
         refreshUrl=f"{auth_settings.tenant_base_url}{auth_settings.authorization}",
         tokenUrl=f"{auth_settings.tenant_base_url}{auth_settings.token_path}",
     )
+
+
+class IdempotencySettings(BaseSettings):
+    """Settings for the idempotency keys store."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="IDEMPOTENCY_")
+
+    maxsize: int = 10_000
+    ttl: int = 24 * 3600
+
+
+@lru_cache
+def get_idempotency_settings() -> IdempotencySettings:
+    """Get the idempotency settings."""
+    return IdempotencySettings()
+
+
+class SharedCacheSettings(BaseSettings):
+    """Settings for the cache shared by the workers of a host."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="SHARED_CACHE_")
+
+    path: str | None = None
+
+    jwks_ttl: int = 3600
+    jwks_min_refresh_interval: int = 30
+
+    verified_tokens: bool = False
+
+
+@lru_cache
+def get_shared_cache_settings() -> SharedCacheSettings:
+    """Get the shared cache settings."""
+    return SharedCacheSettings()
+
+
+class LoanSettings(BaseSettings):
+    """Settings for the loans lifecycle."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="LOAN_")
+
+    request_ttl: timedelta = timedelta(days=2)
+    duration: timedelta = timedelta(weeks=3)
+
+    write_batch_window: float = Field(default=0.001, ge=0)
+    write_batch_size: int = Field(default=64, gt=0)
+
+
+@lru_cache
+def get_loan_settings() -> LoanSettings:
+    """Get the loan settings."""
+    return LoanSettings()
+
+
+class CompressionSettings(BaseSettings):
+    """Settings for the responses compression."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="COMPRESSION_")
+
+    minimum_size: int = 1024
+    gzip_level: int = 6
+    zstd_level: int = 3
+    excluded_paths: tuple[str, ...] = ("/auth/",)
+
+
+@lru_cache
+def get_compression_settings() -> CompressionSettings:
+    """Get the compression settings."""
+    return CompressionSettings()
+
+
+class LoggingSettings(BaseSettings):
+    """Settings for the access and audit logs."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="LOGGING_")
+
+    level: str = "INFO"
+    path: str | None = None
+
+    queue_size: int = Field(default=10_000, gt=0)
+    overload_policy: Literal["drop", "sample"] = "drop"
+    sample_rate: float = Field(default=0.1, ge=0, le=1)
+    sample_watermark: float = Field(default=0.8, ge=0, le=1)
+
+    audit_queue_size: int = Field(default=1_000, gt=0)
+    audit_timeout: float = Field(default=0, ge=0)
+
+
+@lru_cache
+def get_logging_settings() -> LoggingSettings:
+    """Get the logging settings."""
+    return LoggingSettings()
@@ -0,0 +1,103 @@
+"""Idempotency keys support for mutation routes."""
+
+import asyncio
+from dataclasses import dataclass
+from functools import lru_cache
+from http import HTTPStatus
+from typing import Annotated, Any, Awaitable, Callable, TypeVar
+from weakref import WeakValueDictionary
+
+from cachetools import TTLCache
+from fastapi import Depends, Header, HTTPException
+from pydantic import BaseModel
+
+from library_api.api.config import IdempotencySettings, get_idempotency_settings
+from library_api.api.security import JWT
+from library_api.api.security.authentication import authentication
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class _StoredResponse:
+    """First response recorded for an idempotency key."""
+
+    fingerprint: tuple[str, str]
+    response: Any
+
+
+class IdempotencyStore:
+    """Bounded and TTL-evicted store of the first response given for a (subject, idempotency key) pair."""
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        """Initialize the store with its capacity and time-to-live in seconds."""
+        self._responses = TTLCache[tuple[str, str], _StoredResponse](maxsize=maxsize, ttl=ttl)
+        self._locks: WeakValueDictionary[tuple[str, str], asyncio.Lock] = WeakValueDictionary()
+
+    def lock(self, subject: str, key: str) -> asyncio.Lock:
+        """Get the lock serializing the requests of a subject and key, kept as long as it is in use."""
+        lock = self._locks.get((subject, key), None)
+        if lock is None:
+            lock = self._locks[(subject, key)] = asyncio.Lock()
+        return lock
+
+    def get(self, subject: str, key: str) -> _StoredResponse | None:
+        """Get the stored response for a subject and key, if any."""
+        return self._responses.get((subject, key), None)
+
+    def set(self, subject: str, key: str, fingerprint: tuple[str, str], response: Any) -> None:  # noqa: ANN401
+        """Store the response for a subject and key."""
+        self._responses[(subject, key)] = _StoredResponse(fingerprint=fingerprint, response=response)
+
+
+@lru_cache
+def get_idempotency_store(
+    idempotency_settings: Annotated[IdempotencySettings, Depends(get_idempotency_settings)],
+) -> IdempotencyStore:
+    """Get the idempotency store."""
+    return IdempotencyStore(maxsize=idempotency_settings.maxsize, ttl=idempotency_settings.ttl)
+
+
+@dataclass(frozen=True)
+class Idempotency:
+    """Idempotency context of a request, bound to the JWT subject and the `Idempotency-Key` header."""
+
+    store: IdempotencyStore
+    subject: str
+    key: str | None
+
+    async def replay_or(self, operation: str, payload: BaseModel, mutation: Callable[[], Awaitable[T]]) -> T:
+        """Replay the stored response for the idempotency key or run the mutation and store its response.
+
+        Only successful responses are stored: a failed mutation can be retried with the same key.
+        Reusing a key for a different operation or payload is rejected with an HTTP/422.
+        Concurrent requests with the same key wait for the first one rather than running the mutation again.
+        """
+        if self.key is None:
+            return await mutation()
+
+        fingerprint = (operation, payload.model_dump_json())
+
+        async with self.store.lock(self.subject, self.key):
+            stored = self.store.get(self.subject, self.key)
+
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    raise HTTPException(
+                        status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                        detail="Idempotency key was already used for a different request.",
+                    )
+                return stored.response
+
+            response = await mutation()
+            self.store.set(self.subject, self.key, fingerprint, response)
+            return response
+
+
+def idempotency(
+    jwt: Annotated[JWT, Depends(authentication)],
+    store: Annotated[IdempotencyStore, Depends(get_idempotency_store)],
+    idempotency_key: Annotated[str | None, Header(min_length=1, max_length=255)] = None,
+) -> Idempotency:
+    """Get the idempotency context from the `Idempotency-Key` header."""
+    return Idempotency(store=store, subject=jwt.subject, key=idempotency_key)
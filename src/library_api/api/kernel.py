@@ -1,8 +1,9 @@
 """Kernel of the FastAPI HTTP application."""
 
+from contextlib import asynccontextmanager
 from http import HTTPStatus
+from typing import AsyncIterator
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.exception_handlers import http_exception_handler
 from jwt import PyJWTError
@@ -10,9 +11,13 @@ from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.responses import Response
 
-from library_api.api.config import get_auth_settings
+from library_api.api.compression import CompressionMiddleware
+from library_api.api.config import get_auth_settings, get_compression_settings, get_logging_settings
+from library_api.api.logs import AccessLogMiddleware, audit_loan, logging_pipeline
+from library_api.api.repositories import fake_loan_repository, fake_loan_write_batcher
 from library_api.api.routers.auth import router as auth_router
 from library_api.api.routers.loans import router as loans_router
+from library_api.api.scheduling import LoanExpiryScheduler
 from library_api.api.security.exceptions import (
     AuthenticationError,
     jwt_exception_handler,
@@ -29,7 +34,24 @@ async def native_http_exception_dispatcher_handler(request: Request, exc: HTTPEx
     return await http_exception_handler(request, exc)
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI) -> AsyncIterator[None]:
+    """Generate the OpenAPI schema ahead of the first request, run the background tasks and drain them on shutdown."""
+    application.openapi()
+    with logging_pipeline(get_logging_settings()):
+        unsubscribe = fake_loan_repository.subscribe(audit_loan)
+        try:
+            async with LoanExpiryScheduler(fake_loan_repository).running():
+                try:
+                    yield
+                finally:
+                    await fake_loan_write_batcher.drain()
+        finally:
+            unsubscribe()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     exception_handlers={PyJWTError: jwt_exception_handler, HTTPException: native_http_exception_dispatcher_handler},
     responses={
         HTTPStatus.UNAUTHORIZED: {"model": AuthenticationError},
@@ -41,10 +63,21 @@ app = FastAPI(
     },
 )
 
+app.add_middleware(
+    CompressionMiddleware,  # pyright: ignore [reportArgumentType]
+    minimum_size=get_compression_settings().minimum_size,
+    gzip_level=get_compression_settings().gzip_level,
+    zstd_level=get_compression_settings().zstd_level,
+    excluded_paths=get_compression_settings().excluded_paths,
+)
+app.add_middleware(AccessLogMiddleware)  # pyright: ignore [reportArgumentType]
+
 app.include_router(auth_router)
 app.include_router(loans_router)
 
 
 def server() -> None:
     """Run the ASGI server."""
+    import uvicorn  # imported lazily: only needed to run the server, not to load the application
+
     uvicorn.run("library_api.api.kernel:app", host="0.0.0.0", port=8000, reload=True, server_header=False)
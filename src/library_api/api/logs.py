@@ -0,0 +1,243 @@
+"""Structured access and audit logs, written by a background thread."""
+
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from library_api.api.config import LoggingSettings
+from library_api.domain.models import Loan
+
+access_logger = logging.getLogger("library_api.access")
+audit_logger = logging.getLogger("library_api.audit")
+
+_request_state: ContextVar[dict[str, Any] | None] = ContextVar("request_state", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a log record as a JSON line, with the fields given in `extra={"fields": {...}}`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the record."""
+        return json.dumps(
+            {
+                "timestamp": record.created,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **getattr(record, "fields", {}),
+            },
+            default=str,
+        )
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueue records for a background thread, without blocking the caller.
+
+    When the queue holds `queue_size` records, access records are dropped. With the "sample" overload policy,
+    records of the sampled loggers are also only kept at `sample_rate` once the queue fills up past
+    `sample_watermark`. Audit records, which must be kept, have `audit_queue_size` more slots to themselves
+    and are only dropped once those are full too.
+
+    Audit records are logged from the event loop: an `audit_timeout` above 0 makes them wait up to that many
+    seconds for a slot, stalling the loop meanwhile, and is only meant for callers running off the loop.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        overload_policy: str,
+        sample_rate: float,
+        sample_watermark: float,
+        audit_queue_size: int = 1_000,
+        audit_timeout: float = 0,
+        sampled_loggers: frozenset[str] = frozenset({access_logger.name}),
+        audited_loggers: frozenset[str] = frozenset({audit_logger.name}),
+    ) -> None:
+        """Initialize the handler with a bounded queue."""
+        super().__init__(queue.Queue(maxsize=queue_size + audit_queue_size))
+        self.queue_size = queue_size
+        self.overload_policy = overload_policy
+        self.sample_rate = sample_rate
+        self.sample_watermark = sample_watermark
+        self.audit_timeout = audit_timeout
+        self.sampled_loggers = sampled_loggers
+        self.audited_loggers = audited_loggers
+        self.dropped = 0
+        self.dropped_audit = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Enqueue the record as is: the queue is in-process, so it needs neither to be formatted nor copied."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Enqueue a record, or drop it according to the overload policy."""
+        if record.name in self.audited_loggers:
+            try:
+                if self.audit_timeout > 0:
+                    self.queue.put(record, timeout=self.audit_timeout)  # pyright: ignore [reportAttributeAccessIssue]
+                else:
+                    self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                self.dropped_audit += 1
+            return
+
+        size = self.queue.qsize()  # pyright: ignore [reportAttributeAccessIssue]
+        if size >= self.queue_size or (
+            self.overload_policy == "sample"
+            and record.name in self.sampled_loggers
+            and size >= self.queue_size * self.sample_watermark
+            and random.random() >= self.sample_rate
+        ):
+            self.dropped += 1
+            return
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DropReportingQueueListener(QueueListener):
+    """Write the queued records from a background thread, and log how many records were dropped since last time."""
+
+    def __init__(self, queue_handler: NonBlockingQueueHandler, *handlers: logging.Handler) -> None:
+        """Initialize the listener of the queue of a handler."""
+        super().__init__(queue_handler.queue, *handlers)
+        self.queue_handler = queue_handler
+        self.reported = 0
+        self.reported_audit = 0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        """Write a record, then report the drops if any."""
+        super().handle(record)
+        self.report_dropped()
+
+    def report_dropped(self) -> None:
+        """Log the number of records dropped since the last report, as an error if audit records were dropped."""
+        dropped, dropped_audit = self.queue_handler.dropped, self.queue_handler.dropped_audit
+        if dropped == self.reported:
+            return
+
+        record = logging.LogRecord(
+            name="library_api.logs",
+            level=logging.ERROR if dropped_audit > self.reported_audit else logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %s log records, %s of them audit records",
+            args=(dropped - self.reported, dropped_audit - self.reported_audit),
+            exc_info=None,
+        )
+        record.fields = {"dropped": dropped - self.reported, "dropped_audit": dropped_audit - self.reported_audit}
+        self.reported, self.reported_audit = dropped, dropped_audit
+        super().handle(record)
+
+    def stop(self) -> None:
+        """Write the remaining records and report the last drops."""
+        super().stop()
+        self.report_dropped()
+
+
+@contextmanager
+def logging_pipeline(logging_settings: LoggingSettings) -> Iterator[NonBlockingQueueHandler]:
+    """Route the application logs through a queue drained by a background thread."""
+    output = logging.FileHandler(logging_settings.path) if logging_settings.path else logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    handler = NonBlockingQueueHandler(
+        queue_size=logging_settings.queue_size,
+        overload_policy=logging_settings.overload_policy,
+        sample_rate=logging_settings.sample_rate,
+        sample_watermark=logging_settings.sample_watermark,
+        audit_queue_size=logging_settings.audit_queue_size,
+        audit_timeout=logging_settings.audit_timeout,
+    )
+    listener = DropReportingQueueListener(handler, output)
+
+    logger = logging.getLogger("library_api")
+    level = logger.level
+    logger.setLevel(logging_settings.level)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        yield handler
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+        listener.stop()
+        output.close()
+
+
+class AccessLogMiddleware:
+    """Log every HTTP request with its status, duration and authenticated subject."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the middleware."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Log the request once its response is sent."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = scope.setdefault("state", {})
+        token = _request_state.set(state)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_state.reset(token)
+            access_logger.info(
+                "%s %s %s",
+                scope["method"],
+                scope["path"],
+                status,
+                extra={
+                    "fields": {
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                        "subject": state.get("subject"),
+                    }
+                },
+            )
+
+
+def audit_loan(loan: Loan) -> None:
+    """Log a loan transition along with the subject who made it, or the system for scheduled expiries."""
+    state = _request_state.get()
+    actor = state.get("subject") if state is not None else None
+    audit_logger.info(
+        "Loan %s %s",
+        loan.id,
+        loan.status,
+        extra={
+            "fields": {
+                "actor": actor or "system",
+                "loan_id": loan.id,
+                "book_id": loan.book_id,
+                "user_id": loan.user_id,
+                "status": loan.status,
+                "overdue": loan.overdue,
+            }
+        },
+    )
@@ -0,0 +1,164 @@
+"""Persistent data structures, sharing their unchanged parts between versions."""
+
+from itertools import islice
+from typing import Generic, Iterator, Mapping, Optional, Sequence, Tuple, TypeVar, overload
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_CHUNK_SIZE = 64
+_BUCKETS = 256
+
+
+class PersistentMap(Mapping[K, V], Generic[K, V]):
+    """Immutable mapping ordered by insertion, whose updates return a new map sharing most of the previous one.
+
+    Items are kept in an append-only log of fixed-size chunks and their positions in hash buckets: an update
+    copies one chunk, one bucket and the tuples referencing them, rather than every item.
+    Removed items leave a hole in the log, which is compacted once holes outnumber the items.
+    """
+
+    __slots__ = ("_buckets", "_chunks", "_length", "_holes")
+
+    def __init__(self) -> None:
+        """Initialize an empty map."""
+        self._buckets: Tuple[Mapping[K, int], ...] = ({},) * _BUCKETS
+        self._chunks: Tuple[Tuple[Optional[Tuple[K, V]], ...], ...] = ()
+        self._length = 0
+        self._holes = 0
+
+    def _position(self, key: K) -> Optional[int]:
+        """Get the position of a key in the log."""
+        return self._buckets[hash(key) % _BUCKETS].get(key, None)
+
+    def __getitem__(self, key: K) -> V:
+        """Get the value of a key."""
+        position = self._position(key)
+        if position is None:
+            raise KeyError(key)
+        item = self._chunks[position // _CHUNK_SIZE][position % _CHUNK_SIZE]
+        assert item is not None
+        return item[1]
+
+    def __contains__(self, key: object) -> bool:
+        """Check whether a key is in the map."""
+        return self._position(key) is not None  # pyright: ignore [reportArgumentType]
+
+    def __len__(self) -> int:
+        """Get the number of items."""
+        return self._length
+
+    def __iter__(self) -> Iterator[K]:
+        """Iterate over the keys in insertion order."""
+        for chunk in self._chunks:
+            for item in chunk:
+                if item is not None:
+                    yield item[0]
+
+    def ordered_values(self) -> "PersistentMapValues[V]":
+        """Get a sequence of the values in insertion order, reading the log of this version without copying it."""
+        return PersistentMapValues(self._chunks, self._length)
+
+    def _evolve(
+        self,
+        buckets: Tuple[Mapping[K, int], ...],
+        chunks: Tuple[Tuple[Optional[Tuple[K, V]], ...], ...],
+        length: int,
+        holes: int,
+    ) -> "PersistentMap[K, V]":
+        """Create a new version of the map."""
+        evolved: PersistentMap[K, V] = PersistentMap.__new__(PersistentMap)
+        evolved._buckets = buckets
+        evolved._chunks = chunks
+        evolved._length = length
+        evolved._holes = holes
+        if holes > max(length, _CHUNK_SIZE):
+            return evolved._compacted()
+        return evolved
+
+    def _compacted(self) -> "PersistentMap[K, V]":
+        """Rebuild the map without holes, in a single pass over its items."""
+        items = [item for chunk in self._chunks for item in chunk if item is not None]
+        buckets: list[dict[K, int]] = [{} for _ in range(_BUCKETS)]
+        for position, (key, _) in enumerate(items):
+            buckets[hash(key) % _BUCKETS][key] = position
+        chunks = tuple(tuple(items[start : start + _CHUNK_SIZE]) for start in range(0, len(items), _CHUNK_SIZE))
+        return self._evolve(tuple(buckets), chunks, len(items), 0)
+
+    def _with_bucket(self, key: K, position: Optional[int]) -> Tuple[Mapping[K, int], ...]:
+        """Copy the bucket of a key with its new position, or without it."""
+        index = hash(key) % _BUCKETS
+        bucket = dict(self._buckets[index])
+        if position is None:
+            del bucket[key]
+        else:
+            bucket[key] = position
+        return self._buckets[:index] + (bucket,) + self._buckets[index + 1 :]
+
+    def _with_item(self, position: int, item: Optional[Tuple[K, V]]) -> Tuple[Tuple[Optional[Tuple[K, V]], ...], ...]:
+        """Copy the chunk of a position with its new item, appending a chunk if needed."""
+        index, offset = divmod(position, _CHUNK_SIZE)
+        chunk = self._chunks[index] if index < len(self._chunks) else ()
+        chunk = chunk[:offset] + (item,) + chunk[offset + 1 :]
+        return self._chunks[:index] + (chunk,) + self._chunks[index + 1 :]
+
+    def set(self, key: K, value: V) -> "PersistentMap[K, V]":
+        """Return a map with the value of a key replaced in place, or appended if the key is new."""
+        position = self._position(key)
+        if position is not None:
+            return self._evolve(self._buckets, self._with_item(position, (key, value)), self._length, self._holes)
+
+        position = self._length + self._holes
+        return self._evolve(
+            self._with_bucket(key, position), self._with_item(position, (key, value)), self._length + 1, self._holes
+        )
+
+    def remove(self, key: K) -> "PersistentMap[K, V]":
+        """Return a map without a key, or the map itself if the key is missing."""
+        position = self._position(key)
+        if position is None:
+            return self
+        return self._evolve(
+            self._with_bucket(key, None), self._with_item(position, None), self._length - 1, self._holes + 1
+        )
+
+
+class PersistentMapValues(Sequence[V], Generic[V]):
+    """Read-only sequence of the values of a persistent map version, in insertion order.
+
+    Iterating is linear, indexing scans the log from its start: it is meant to be iterated.
+    """
+
+    __slots__ = ("_chunks", "_length")
+
+    def __init__(self, chunks: Tuple[Tuple[Optional[Tuple[object, V]], ...], ...], length: int) -> None:
+        """Initialize the sequence over the log of a map version."""
+        self._chunks = chunks
+        self._length = length
+
+    def __len__(self) -> int:
+        """Get the number of values."""
+        return self._length
+
+    def __iter__(self) -> Iterator[V]:
+        """Iterate over the values in insertion order."""
+        for chunk in self._chunks:
+            for item in chunk:
+                if item is not None:
+                    yield item[1]
+
+    @overload
+    def __getitem__(self, index: int) -> V: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[V]: ...
+
+    def __getitem__(self, index: int | slice) -> V | Sequence[V]:
+        """Get a value, or the values of a slice, by their position in insertion order."""
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return next(islice(self, index, None))
@@ -1,12 +1,18 @@
 """Fake in-memory repositories for testing purposes."""
 
+import threading
 import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
 from http import HTTPStatus
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
 
-from library_api.domain.models import Book, Loan, LoanStatus
+from library_api.api.batching import LoanWriteBatcher
+from library_api.api.config import get_loan_settings
+from library_api.api.persistent import PersistentMap
+from library_api.domain.models import ApproveLoan, Book, Loan, LoanMutation, LoanStatus, RequestLoan, ReturnLoan
 from library_api.domain.repositories import BookRepository, LoanRepository
 
 
@@ -34,72 +40,200 @@ class InMemoryBookRepository(BookRepository):
         return book
 
 
+@dataclass(frozen=True)
+class LoanSnapshot:
+    """Immutable and versioned view of the loans, safe to iterate while loans are mutated.
+
+    Snapshots share the loans they have in common, so publishing one after a mutation does not copy every loan.
+    """
+
+    version: int
+    loans: PersistentMap[str, Loan]
+    active_loans: PersistentMap[uuid.UUID, str]
+
+    @property
+    def ordered(self) -> Sequence[Loan]:
+        """Get the loans in insertion order, read from the snapshot without copying them."""
+        return self.loans.ordered_values()
+
+    def put(self, loan: Loan) -> "LoanSnapshot":
+        """Return a snapshot with a loan added or replaced, and the active loan of its book updated."""
+        active_loans = self.active_loans
+        if loan.active:
+            active_loans = active_loans.set(loan.book_id, str(loan.id))
+        elif active_loans.get(loan.book_id, None) == str(loan.id):
+            active_loans = active_loans.remove(loan.book_id)
+        return replace(self, loans=self.loans.set(str(loan.id), loan), active_loans=active_loans)
+
+    def remove(self, loan_id: str) -> "LoanSnapshot":
+        """Return a snapshot without a loan."""
+        loan = self.loans.get(loan_id, None)
+        if loan is None:
+            return self
+
+        active_loans = self.active_loans
+        if active_loans.get(loan.book_id, None) == loan_id:
+            active_loans = active_loans.remove(loan.book_id)
+        return replace(self, loans=self.loans.remove(loan_id), active_loans=active_loans)
+
+
 class InMemoryLoanRepository(LoanRepository):
-    """In-memory implementation of the LoanRepository."""
+    """In-memory implementation of the LoanRepository.
+
+    Writers derive a new snapshot from the current one and publish it under a lock, readers never lock nor copy.
+    """
 
-    def __init__(self, book_repository: BookRepository) -> None:
-        """Initialize the repository with a reference to the book repository."""
+    def __init__(self, book_repository: BookRepository, request_ttl: timedelta, loan_duration: timedelta) -> None:
+        """Initialize the repository with a reference to the book repository and the loans lifecycle durations."""
         self.book_repository = book_repository
-        self._loans: Dict[str, Loan] = {}
+        self.request_ttl = request_ttl
+        self.loan_duration = loan_duration
+        self._listeners: List[Callable[[Loan], None]] = []
+        self._lock = threading.Lock()
+        self._snapshot = LoanSnapshot(version=0, loans=PersistentMap(), active_loans=PersistentMap())
+
+    def snapshot(self) -> LoanSnapshot:
+        """Get the current snapshot of the loans."""
+        return self._snapshot
+
+    def _publish(self, snapshot: LoanSnapshot) -> None:
+        """Publish a new snapshot of the loans, must be called with the lock held."""
+        self._snapshot = replace(snapshot, version=self._snapshot.version + 1)
+
+    def notify(self, loan: Loan) -> None:
+        """Call the listeners with a created or changed loan."""
+        for listener in self._listeners:
+            listener(loan)
+
+    def subscribe(self, listener: Callable[[Loan], None]) -> Callable[[], None]:
+        """Call a listener with every loan created or changed, until the returned callable unsubscribes it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
 
     def get_by_id(self, loan_id: uuid.UUID) -> Loan | None:
         """Get a loan by its ID."""
-        return self._loans.get(str(loan_id), None)
+        return self._snapshot.loans.get(str(loan_id), None)
 
-    def list(self, user_id: str) -> List[Loan]:
+    def list(self, user_id: str) -> Sequence[Loan]:
         """List all loans, optionally filtered by user ID."""
         if not user_id:
             raise ValueError("A user_id must be provided")
 
-        return [loan for loan in self._loans.values() if loan.user_id == user_id]
+        return [loan for loan in self._snapshot.ordered if loan.user_id == user_id]
 
-    def list_all(self) -> List[Loan]:
+    def list_all(self) -> Sequence[Loan]:
         """List all loans."""
-        return list(self._loans.values())
+        return self._snapshot.ordered
+
+    def list_overdue(self) -> Sequence[Loan]:
+        """List all approved loans past their due date."""
+        return [loan for loan in self._snapshot.ordered if loan.status == LoanStatus.APPROVED and loan.overdue]
 
     def request(self, book_id: uuid.UUID, user_id: str) -> Loan:
         """Request a new loan."""
-        if self.book_repository.get_by_id(book_id) is None:
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Book with given ID does not exist.")
+        return self._commit_one(RequestLoan(book_id=book_id, user_id=user_id))
 
-        loaned = [
-            loan for loan in self._loans.values() if loan.book_id == book_id and loan.status != LoanStatus.RETURNED
-        ]
+    def approve(self, loan_id: uuid.UUID) -> Loan:
+        """Approve a requested loan."""
+        return self._commit_one(ApproveLoan(loan_id=loan_id))
 
-        if loaned:
-            raise HTTPException(status_code=HTTPStatus.CONFLICT, detail="Book is already loaned.")
+    def return_(self, loan_id: uuid.UUID) -> Loan:
+        """Return a loaned book."""
+        return self._commit_one(ReturnLoan(loan_id=loan_id))
 
-        loan = Loan.request(book_id, user_id)
-        self._loans[str(loan.id)] = loan
-        return loan
+    def _commit_one(self, mutation: LoanMutation) -> Loan:
+        """Commit a single mutation and notify the listeners, raising its error if any."""
+        [result] = self.commit([mutation])
+        if isinstance(result, Exception):
+            raise result
+        self.notify(result)
+        return result
 
-    def approve(self, loan_id: uuid.UUID) -> Loan:
-        """Approve a requested loan."""
-        if str(loan_id) not in self._loans.keys():
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Loan with given ID does not exist.")
+    def commit(self, mutations: Sequence[LoanMutation]) -> List[Loan | Exception]:
+        """Apply mutations in order and commit them together, return the loan or the error of each mutation.
+
+        A failed mutation leaves the loans untouched, the following ones are applied on top of the previous ones.
+        The listeners are not notified: the caller notifies them of each committed loan with `notify`.
+        """
+        results: List[Loan | Exception] = []
+        with self._lock:
+            snapshot = self._snapshot
+            for mutation in mutations:
+                try:
+                    snapshot, loan = self._apply(snapshot, mutation)
+                    results.append(loan)
+                except HTTPException as error:
+                    results.append(error)
+
+            if any(isinstance(result, Loan) for result in results):
+                self._publish(snapshot)
+        return results
+
+    def _apply(self, snapshot: LoanSnapshot, mutation: LoanMutation) -> Tuple[LoanSnapshot, Loan]:
+        """Apply a mutation to a snapshot, raise an HTTP error if it is not allowed."""
+        match mutation:
+            case RequestLoan(book_id=book_id, user_id=user_id):
+                if self.book_repository.get_by_id(book_id) is None:
+                    raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Book with given ID does not exist.")
+
+                if book_id in snapshot.active_loans:
+                    raise HTTPException(status_code=HTTPStatus.CONFLICT, detail="Book is already loaned.")
+
+                loan = Loan.request(book_id, user_id, expires_in=self.request_ttl)
+                return snapshot.put(loan), loan
+
+            case ApproveLoan(loan_id=loan_id):
+                if str(loan_id) not in snapshot.loans:
+                    raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Loan with given ID does not exist.")
+
+                if snapshot.loans[str(loan_id)].status != LoanStatus.REQUESTED:
+                    raise HTTPException(
+                        status_code=HTTPStatus.BAD_REQUEST, detail="Cannot approve a loan that was not requested."
+                    )
+
+                loan = snapshot.loans[str(loan_id)].approve(duration=self.loan_duration)
+                return snapshot.remove(str(loan_id)).put(loan), loan
+
+            case ReturnLoan(loan_id=loan_id):
+                loan = snapshot.loans.get(str(loan_id), None)
 
-        loan = self._loans.pop(str(loan_id)).approve()
-        self._loans[str(loan.id)] = loan
-        return loan
+                if loan is None:
+                    raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Loan with given ID does not exist.")
+
+                if loan.status != LoanStatus.APPROVED:
+                    raise HTTPException(
+                        status_code=HTTPStatus.BAD_REQUEST, detail="Cannot return a loan that was not approved."
+                    )
+
+                loan = loan.return_loan()
+                return snapshot.put(loan), loan
 
     def delete(self, loan_id: uuid.UUID) -> None:
         """Delete a loan by its ID."""
-        self._loans.pop(str(loan_id), None)
+        with self._lock:
+            if str(loan_id) not in self._snapshot.loans:
+                return
 
-    def return_(self, loan_id: uuid.UUID) -> Loan:
-        """Return a loaned book."""
-        loan = self._loans.get(str(loan_id), None)
+            self._publish(self._snapshot.remove(str(loan_id)))
 
-        if loan is None:
-            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Loan with given ID does not exist.")
+    def expire(self, loan_id: uuid.UUID, now: datetime) -> Loan | None:
+        """Cancel an expired loan request or flag an overdue loan, return the loan if it changed.
 
-        if loan.status != LoanStatus.APPROVED:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST, detail="Cannot return a loan that was not approved."
-            )
+        The listeners are notified once the lock is released, so a slow listener does not hold up the writes.
+        """
+        with self._lock:
+            loan = self._snapshot.loans.get(str(loan_id), None)
+            if loan is None:
+                return None
 
-        self._loans[str(loan.id)] = loan.return_loan()
-        return loan
+            expired = loan.expire(now)
+            if expired == loan:
+                return None
+
+            self._publish(self._snapshot.put(expired))
+
+        self.notify(expired)
+        return expired
 
 
 BOOK_IDS = [
@@ -109,7 +243,16 @@ BOOK_IDS = [
 ]
 
 fake_book_repository = InMemoryBookRepository()
-fake_loan_repository = InMemoryLoanRepository(fake_book_repository)
+fake_loan_repository = InMemoryLoanRepository(
+    fake_book_repository,
+    request_ttl=get_loan_settings().request_ttl,
+    loan_duration=get_loan_settings().duration,
+)
+fake_loan_write_batcher = LoanWriteBatcher(
+    fake_loan_repository,
+    window=get_loan_settings().write_batch_window,
+    max_size=get_loan_settings().write_batch_size,
+)
 
 fake_book_repository.create(
     Book(
@@ -1,16 +1,17 @@
 """Router for loan-related operations."""
 
 import uuid
-from typing import Annotated
+from typing import Annotated, Sequence
 
 from fastapi import APIRouter, Depends
 from pydantic import Field, BaseModel
 
-from library_api.api.repositories import fake_loan_repository, BOOK_IDS
+from library_api.api.idempotency import Idempotency, idempotency
+from library_api.api.repositories import fake_loan_repository, fake_loan_write_batcher, BOOK_IDS
 from library_api.api.security import JWT, Permission
 from library_api.api.security.authentication import authentication
 from library_api.api.security.authorization import require_permissions
-from library_api.domain.models import Loan
+from library_api.domain.models import ApproveLoan, Loan, RequestLoan
 
 router = APIRouter(
     prefix="/loans",
@@ -31,24 +32,41 @@ class LoanApprove(BaseModel):
 
 
 @router.post("/", dependencies=[require_permissions(required={Permission.LOAN_REQUEST})])
-async def request_a_loan(loan: LoanRequest, jwt: Annotated[JWT, Depends(authentication)]) -> Loan:
+async def request_a_loan(
+    loan: LoanRequest,
+    jwt: Annotated[JWT, Depends(authentication)],
+    idempotent: Annotated[Idempotency, Depends(idempotency)],
+) -> Loan:
     """Request a new loan for a book."""
-    return fake_loan_repository.request(book_id=loan.book_id, user_id=jwt.subject)
+    return await idempotent.replay_or(
+        "loans.request",
+        loan,
+        lambda: fake_loan_write_batcher.submit(RequestLoan(book_id=loan.book_id, user_id=jwt.subject)),
+    )
 
 
 @router.post("/approve", dependencies=[require_permissions(required={Permission.LOAN_APPROVE})])
-async def approve_a_loan(loan: LoanApprove) -> Loan:
+async def approve_a_loan(loan: LoanApprove, idempotent: Annotated[Idempotency, Depends(idempotency)]) -> Loan:
     """Approve a previously requested loan for a book."""
-    return fake_loan_repository.approve(loan.loan_id)
+    return await idempotent.replay_or(
+        "loans.approve", loan, lambda: fake_loan_write_batcher.submit(ApproveLoan(loan_id=loan.loan_id))
+    )
 
 
 @router.get("/me", dependencies=[require_permissions(required={Permission.LOAN_READ})])
-async def list_loans_for_a_user(jwt: Annotated[JWT, Depends(authentication)]) -> list[Loan]:
+async def list_loans_for_a_user(jwt: Annotated[JWT, Depends(authentication)]) -> Sequence[Loan]:
     """List all book loans."""
     return fake_loan_repository.list(user_id=jwt.subject)
 
 
+@router.get("/overdue", dependencies=[require_permissions(required={Permission.LOAN_READ_ALL})])
+async def list_overdue_loans() -> Sequence[Loan]:
+    """List all book loans past their due date."""
+    return fake_loan_repository.list_overdue()
+
+
 @router.get("/", dependencies=[require_permissions(required={Permission.LOAN_READ_ALL})])
-async def list_all_loans() -> list[Loan]:
+async def list_all_loans() -> Sequence[Loan]:
     """List all book loans."""
-    return fake_loan_repository.list_all()
+    # The response validation copies the loans into a list anyway, and only re-creates lists and tuples as is.
+    return list(fake_loan_repository.list_all())
@@ -0,0 +1,90 @@
+"""Background scheduling of the loans expiry."""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable
+
+from library_api.domain.models import Loan
+from library_api.domain.repositories import LoanRepository
+
+
+def _utc_now() -> datetime:
+    """Get the current UTC date."""
+    return datetime.now(tz=timezone.utc)
+
+
+class LoanExpiryScheduler:
+    """Cancel expired loan requests and flag overdue loans at their deadline.
+
+    Deadlines are kept in a min-heap, costing O(log n) per scheduled loan instead of periodic scans of every loan.
+    Deadlines made obsolete by a later transition of their loan stay in the heap and are skipped once due.
+    """
+
+    def __init__(self, loan_repository: LoanRepository, clock: Callable[[], datetime] = _utc_now) -> None:
+        """Initialize the scheduler for the loans of a repository."""
+        self.loan_repository = loan_repository
+        self.clock = clock
+        self._deadlines: list[tuple[datetime, int, uuid.UUID]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup = asyncio.Event()
+
+    def schedule(self, loan: Loan) -> None:
+        """Schedule the expiry of a loan at its next deadline, if any."""
+        deadline = loan.deadline
+        if deadline is None:
+            return
+
+        with self._lock:
+            heapq.heappush(self._deadlines, (deadline, next(self._sequence), loan.id))
+            earliest = self._deadlines[0][2] == loan.id
+
+        if earliest and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def expire_due(self) -> datetime | None:
+        """Expire the loans whose deadline passed and return the next deadline, if any."""
+        now = self.clock()
+        while True:
+            with self._lock:
+                if not self._deadlines:
+                    return None
+                deadline, _, loan_id = self._deadlines[0]
+                if deadline > now:
+                    return deadline
+                heapq.heappop(self._deadlines)
+
+            self.loan_repository.expire(loan_id, now)
+
+    async def run(self) -> None:
+        """Expire the loans at their deadline until cancelled."""
+        while True:
+            self._wakeup.clear()
+            next_deadline = self.expire_due()
+            timeout = None if next_deadline is None else (next_deadline - self.clock()).total_seconds()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except TimeoutError:
+                pass
+
+    @asynccontextmanager
+    async def running(self) -> AsyncIterator[None]:
+        """Run the scheduler in the background, for the loans already stored and to come."""
+        self._loop = asyncio.get_running_loop()
+        unsubscribe = self.loan_repository.subscribe(self.schedule)
+        for loan in self.loan_repository.list_all():
+            self.schedule(loan)
+
+        task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            task.cancel()
+            unsubscribe()
+            self._loop = None
@@ -1,60 +1,139 @@
 """Authentication using OAuth2."""
 
-import json
+import hashlib
+import time
 from datetime import timedelta
-from typing import Annotated
+from typing import Annotated, Any
 
 import httpx
 import jwt as pyjwt
-import jwt.algorithms as pyjwt_algorithms
 from cachetools import cached, TTLCache
-from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
-from fastapi import Depends
-from jwt import InvalidSignatureError
+from fastapi import Depends, Request
+from jwt import InvalidAlgorithmError, InvalidSignatureError, PyJWK
 
-from library_api.api.caching import key_id_hashkey
-from library_api.api.config import AuthenticationSettings, get_auth_settings, get_auth_client, oauth
+from library_api.api.caching import SharedCache, get_shared_cache, key_id_hashkey
+from library_api.api.config import (
+    AuthenticationSettings,
+    SharedCacheSettings,
+    get_auth_settings,
+    get_auth_client,
+    get_shared_cache_settings,
+    oauth,
+)
 from library_api.api.security import JWT
 
 
-@cached(cache=TTLCache(maxsize=128, ttl=3600), key=key_id_hashkey)
-def _get_json_web_key(httpx_client: httpx.Client, jwks_path: str, kid: str) -> RSAPublicKey:
-    """Fetch the JWK."""
+def _fetch_json_web_key_set(httpx_client: httpx.Client, jwks_path: str) -> dict[str, Any]:
+    """Fetch the JWKS from the identity provider."""
     response = httpx_client.get(url=jwks_path)
     response.raise_for_status()
 
-    jwks = response.json()
+    return response.json()
+
 
+def _find_json_web_key(jwks: dict[str, Any], kid: str) -> PyJWK | None:
+    """Find a JWK by its key ID and build its verifier, dispatched on the key type (`kty`, `alg` & `crv`)."""
     for jwk in jwks["keys"]:
         if jwk["kid"] == kid:
-            return pyjwt_algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))  # pyright: ignore [reportReturnType]
+            return PyJWK(jwk)
+
+    return None
+
+
+@cached(cache=TTLCache(maxsize=128, ttl=3600), key=key_id_hashkey)
+def _get_json_web_key(
+    httpx_client: httpx.Client,
+    jwks_path: str,
+    shared_cache: SharedCache | None,
+    shared_cache_settings: SharedCacheSettings,
+    kid: str,
+    version: int = 0,  # pylint: disable=unused-argument
+) -> PyJWK:
+    """Fetch the JWK, through the cache shared by the workers of the host if enabled.
+
+    An unknown key ID refreshes the shared JWKS, and bumps the shared cache version on key rotation.
+    """
+
+    def fetch() -> dict[str, Any]:
+        return _fetch_json_web_key_set(httpx_client, jwks_path)
+
+    if shared_cache is None:
+        json_web_key = _find_json_web_key(fetch(), kid)
+    else:
+        jwks = shared_cache.get_or_set("jwks", fetch, ttl=shared_cache_settings.jwks_ttl)
+        json_web_key = _find_json_web_key(jwks, kid)
 
-    raise InvalidSignatureError(f"No public key found for the given kid '{kid}'")
+        if json_web_key is None:
+            jwks = shared_cache.refresh(
+                "jwks",
+                fetch,
+                ttl=shared_cache_settings.jwks_ttl,
+                min_interval=shared_cache_settings.jwks_min_refresh_interval,
+            )
+            json_web_key = _find_json_web_key(jwks, kid)
+
+    if json_web_key is None:
+        raise InvalidSignatureError(f"No public key found for the given kid '{kid}'")
+
+    return json_web_key
 
 
 def authentication(
+    request: Request,
     raw_jwt: Annotated[str, Depends(oauth())],
     auth_client: Annotated[httpx.Client, Depends(get_auth_client)],
     auth_settings: Annotated[AuthenticationSettings, Depends(get_auth_settings)],
+    shared_cache: Annotated[SharedCache | None, Depends(get_shared_cache)],
+    shared_cache_settings: Annotated[SharedCacheSettings, Depends(get_shared_cache_settings)],
+) -> JWT:
+    """Return the JWT payload content, and record its subject in the request state."""
+    jwt = _authenticate(raw_jwt, auth_client, auth_settings, shared_cache, shared_cache_settings)
+    request.state.subject = jwt.subject
+    return jwt
+
+
+def _authenticate(
+    raw_jwt: str,
+    auth_client: httpx.Client,
+    auth_settings: AuthenticationSettings,
+    shared_cache: SharedCache | None,
+    shared_cache_settings: SharedCacheSettings,
 ) -> JWT:
-    """Return the JWT payload content."""
+    """Verify the JWT and return its payload content."""
+    token_key = None
+    if shared_cache is not None and shared_cache_settings.verified_tokens:
+        token_key = f"jwt:{hashlib.sha256(raw_jwt.encode()).hexdigest()}"
+        claims = shared_cache.get(token_key)
+        if claims is not None:
+            return JWT(**claims)
+
     kid = pyjwt.get_unverified_header(raw_jwt).get("kid")
     if kid is None:
         msg = "No 'kid' found in the JWT header"
         raise InvalidSignatureError(msg)
 
-    public_key = _get_json_web_key(auth_client, auth_settings.jwks_path, kid)
+    json_web_key = _get_json_web_key(
+        auth_client,
+        auth_settings.jwks_path,
+        shared_cache,
+        shared_cache_settings,
+        kid=kid,
+        version=0 if shared_cache is None else shared_cache.version(),
+    )
 
-    if public_key is None:
-        msg = f"No public key found for the given kid '{kid}'."
-        raise InvalidSignatureError(msg)
+    if json_web_key.algorithm_name not in auth_settings.algorithms:
+        msg = f"The algorithm '{json_web_key.algorithm_name}' of the key '{kid}' is not allowed."
+        raise InvalidAlgorithmError(msg)
 
     jwt = pyjwt.decode(
         jwt=raw_jwt,
-        key=public_key,
+        key=json_web_key.key,
         audience="library-api",
-        algorithms=["RS256"],
+        algorithms=[json_web_key.algorithm_name],
         leeway=timedelta(seconds=10),
     )
 
+    if shared_cache is not None and token_key is not None:
+        shared_cache.set(token_key, jwt, ttl=jwt["exp"] - time.time())
+
     return JWT(**jwt)
@@ -1,7 +1,8 @@
 """Domain models for the library API."""
 
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
 from enum import StrEnum
 
 
@@ -22,6 +23,7 @@ class LoanStatus(StrEnum):
     REQUESTED = "requested"
     APPROVED = "approved"
     RETURNED = "returned"
+    CANCELLED = "cancelled"
 
 
 @dataclass(frozen=True)
@@ -32,31 +34,76 @@ class Loan:
     book_id: uuid.UUID
     user_id: str
     status: LoanStatus
+    requested_at: datetime
+    request_expires_at: datetime
+    due_at: datetime | None = None
+    overdue: bool = False
 
     @staticmethod
-    def request(book_id: uuid.UUID, user_id: str) -> "Loan":
-        """Approve the loan."""
+    def request(book_id: uuid.UUID, user_id: str, expires_in: timedelta) -> "Loan":
+        """Request the loan, to be approved before it expires."""
+        requested_at = datetime.now(tz=timezone.utc)
         return Loan(
             id=uuid.uuid4(),
             book_id=book_id,
             user_id=user_id,
             status=LoanStatus.REQUESTED,
+            requested_at=requested_at,
+            request_expires_at=requested_at + expires_in,
         )
 
-    def approve(self) -> "Loan":
+    @property
+    def active(self) -> bool:
+        """Whether the loan blocks its book."""
+        return self.status in (LoanStatus.REQUESTED, LoanStatus.APPROVED)
+
+    @property
+    def deadline(self) -> datetime | None:
+        """Get the next date the loan expires at, if any."""
+        if self.status == LoanStatus.REQUESTED:
+            return self.request_expires_at
+        if self.status == LoanStatus.APPROVED and not self.overdue:
+            return self.due_at
+        return None
+
+    def approve(self, duration: timedelta) -> "Loan":
         """Approve the loan."""
-        return Loan(
-            id=self.id,
-            book_id=self.book_id,
-            user_id=self.user_id,
-            status=LoanStatus.APPROVED,
-        )
+        return replace(self, status=LoanStatus.APPROVED, due_at=datetime.now(tz=timezone.utc) + duration)
 
     def return_loan(self) -> "Loan":
         """Return the loan."""
-        return Loan(
-            id=self.id,
-            book_id=self.book_id,
-            user_id=self.user_id,
-            status=LoanStatus.RETURNED,
-        )
+        return replace(self, status=LoanStatus.RETURNED)
+
+    def expire(self, now: datetime) -> "Loan":
+        """Cancel the loan if its request expired, or flag it overdue if its due date passed."""
+        deadline = self.deadline
+        if deadline is None or deadline > now:
+            return self
+        if self.status == LoanStatus.REQUESTED:
+            return replace(self, status=LoanStatus.CANCELLED)
+        return replace(self, overdue=True)
+
+
+@dataclass(frozen=True)
+class RequestLoan:
+    """Mutation requesting a loan for a book."""
+
+    book_id: uuid.UUID
+    user_id: str
+
+
+@dataclass(frozen=True)
+class ApproveLoan:
+    """Mutation approving a requested loan."""
+
+    loan_id: uuid.UUID
+
+
+@dataclass(frozen=True)
+class ReturnLoan:
+    """Mutation returning an approved loan."""
+
+    loan_id: uuid.UUID
+
+
+LoanMutation = RequestLoan | ApproveLoan | ReturnLoan
@@ -2,9 +2,10 @@
 
 import uuid
 from abc import ABC, abstractmethod
-from typing import List
+from datetime import datetime
+from typing import Callable, List, Sequence
 
-from library_api.domain.models import Book, Loan
+from library_api.domain.models import Book, Loan, LoanMutation
 
 
 class BookRepository(ABC):
@@ -35,15 +36,20 @@ class LoanRepository(ABC):
         ...
 
     @abstractmethod
-    def list(self, user_id: str) -> List[Loan]:
+    def list(self, user_id: str) -> Sequence[Loan]:
         """List all loans, optionally filtered by user ID."""
         ...
 
     @abstractmethod
-    def list_all(self) -> List[Loan]:
+    def list_all(self) -> Sequence[Loan]:
         """List all loans."""
         ...
 
+    @abstractmethod
+    def list_overdue(self) -> Sequence[Loan]:
+        """List all approved loans past their due date."""
+        ...
+
     @abstractmethod
     def request(self, book_id: uuid.UUID, user_id: str) -> Loan:
         """Request a new loan."""
@@ -54,6 +60,14 @@ class LoanRepository(ABC):
         """Approve a requested loan."""
         ...
 
+    @abstractmethod
+    def commit(self, mutations: Sequence[LoanMutation]) -> List[Loan | Exception]:
+        """Apply mutations in order and commit them together, return the loan or the error of each mutation.
+
+        The listeners are not notified: the caller notifies them of each committed loan with `notify`.
+        """
+        ...
+
     @abstractmethod
     def delete(self, loan_id: uuid.UUID) -> None:
         """Delete a loan by its ID."""
@@ -63,3 +77,18 @@ class LoanRepository(ABC):
     def return_(self, loan_id: uuid.UUID) -> Loan:
         """Return a loaned book."""
         ...
+
+    @abstractmethod
+    def expire(self, loan_id: uuid.UUID, now: datetime) -> Loan | None:
+        """Cancel an expired loan request or flag an overdue loan, return the loan if it changed."""
+        ...
+
+    @abstractmethod
+    def notify(self, loan: Loan) -> None:
+        """Call the listeners with a created or changed loan."""
+        ...
+
+    @abstractmethod
+    def subscribe(self, listener: Callable[[Loan], None]) -> Callable[[], None]:
+        """Call a listener with every loan created or changed, until the returned callable unsubscribes it."""
+        ...
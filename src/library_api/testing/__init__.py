@@ -0,0 +1 @@
+"""Tooling to test and load test the Library API."""
@@ -0,0 +1,200 @@
+"""Local stand-in for the Auth0 identity provider, to load test the authentication offline."""
+
+import asyncio
+import random
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from http import HTTPStatus
+from typing import Any
+
+import jwt as pyjwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
+from fastapi import FastAPI, HTTPException
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from library_api.api.security import Permission
+
+
+class IdentityProviderSettings(BaseSettings):
+    """Settings for the fake identity provider."""
+
+    model_config = SettingsConfigDict(frozen=True, env_prefix="FAKE_IDP_")
+
+    host: str = "127.0.0.1"
+    port: int = 8001
+
+    issuer: str = "http://127.0.0.1:8001/"
+    audience: str = "library-api"
+    algorithm: str = "RS256"
+
+    jwks_latency: float = 0.0
+    jwks_failure_rate: float = Field(default=0.0, ge=0, le=1)
+
+    rotation_interval: float | None = None
+    retained_keys: int = Field(default=2, ge=1)
+
+
+@lru_cache
+def get_identity_provider_settings() -> IdentityProviderSettings:
+    """Get the fake identity provider settings."""
+    return IdentityProviderSettings()
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """Private signing key and its public JWK."""
+
+    key_id: str
+    algorithm: str
+    private_key: PrivateKeyTypes
+    public_key: dict[str, Any]
+
+    @staticmethod
+    def generate(algorithm: str) -> "SigningKey":
+        """Generate a signing key for the given algorithm."""
+        match algorithm:
+            case "RS256":
+                private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+                public_key = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            case "ES256":
+                private_key = ec.generate_private_key(ec.SECP256R1())
+                public_key = ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            case "EdDSA":
+                private_key = ed25519.Ed25519PrivateKey.generate()
+                public_key = OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            case _:
+                raise ValueError(f"Unsupported algorithm '{algorithm}'")
+
+        key_id = str(uuid.uuid4())
+        return SigningKey(
+            key_id=key_id,
+            algorithm=algorithm,
+            private_key=private_key,
+            public_key={"kid": key_id, "alg": algorithm, "use": "sig", **public_key},
+        )
+
+
+class KeyRing:
+    """Signing keys of the identity provider: the newest one signs, the retained ones still verify."""
+
+    def __init__(self, algorithm: str, retained_keys: int, rotation_interval: float | None) -> None:
+        """Initialize the key ring with a first signing key."""
+        self.algorithm = algorithm
+        self.rotation_interval = rotation_interval
+        self._keys: deque[SigningKey] = deque(maxlen=retained_keys)
+        self.rotated_at = 0.0
+        self.rotate()
+
+    def rotate(self) -> SigningKey:
+        """Generate a new signing key, evicting the oldest retained one."""
+        key = SigningKey.generate(self.algorithm)
+        self._keys.appendleft(key)
+        self.rotated_at = time.monotonic()
+        return key
+
+    def rotate_if_due(self) -> None:
+        """Rotate the signing key if the rotation interval elapsed."""
+        if self.rotation_interval is not None and time.monotonic() - self.rotated_at >= self.rotation_interval:
+            self.rotate()
+
+    @property
+    def signing_key(self) -> SigningKey:
+        """Get the current signing key."""
+        return self._keys[0]
+
+    @property
+    def jwks(self) -> dict[str, list[dict[str, Any]]]:
+        """Get the public keys as a JSON Web Key Set."""
+        return {"keys": [key.public_key for key in self._keys]}
+
+
+class TokenRequest(BaseModel):
+    """Request model for minting an access token."""
+
+    subject: str = "auth0|e653d123e9687d9c90d11d92"
+    authorized_party: str = "SL49RJ9JLIIGyKS139tyGbWPAZpwrw"
+    permissions: set[Permission] = Field(default_factory=set)
+    expires_in: int = Field(default=3600, gt=0)
+
+
+class TokenResponse(BaseModel):
+    """Response model of a minted access token."""
+
+    access_token: str
+    token_type: str = "Bearer"
+    expires_in: int
+
+
+def create_app(settings: IdentityProviderSettings | None = None) -> FastAPI:
+    """Create the HTTP application of the fake identity provider."""
+    if settings is None:
+        settings = get_identity_provider_settings()
+
+    key_ring = KeyRing(settings.algorithm, settings.retained_keys, settings.rotation_interval)
+    app = FastAPI(title="Fake identity provider")
+    app.state.key_ring = key_ring
+    app.state.jwks_requests = 0
+
+    @app.get("/.well-known/jwks.json")
+    async def json_web_key_set() -> dict[str, list[dict[str, Any]]]:
+        """Serve the JWKS with the configured latency, failure rate and key rotation."""
+        app.state.jwks_requests += 1
+        if settings.jwks_latency:
+            await asyncio.sleep(settings.jwks_latency)
+
+        if random.random() < settings.jwks_failure_rate:
+            raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail="Injected JWKS failure.")
+
+        key_ring.rotate_if_due()
+        return key_ring.jwks
+
+    @app.post("/oauth/token")
+    async def mint_token(token: TokenRequest) -> TokenResponse:
+        """Mint an access token signed with the current signing key."""
+        key_ring.rotate_if_due()
+        signing_key = key_ring.signing_key
+        issued_at = int(time.time())
+
+        access_token = pyjwt.encode(
+            headers={"kid": signing_key.key_id},
+            payload={
+                "iss": settings.issuer,
+                "sub": token.subject,
+                "aud": settings.audience,
+                "iat": issued_at,
+                "exp": issued_at + token.expires_in,
+                "azp": token.authorized_party,
+                "permissions": sorted(token.permissions),
+            },
+            algorithm=signing_key.algorithm,
+            key=signing_key.private_key,  # pyright: ignore [reportArgumentType]
+        )
+        return TokenResponse(access_token=access_token, expires_in=token.expires_in)
+
+    @app.post("/keys/rotate")
+    async def rotate_keys() -> dict[str, list[dict[str, Any]]]:
+        """Rotate the signing key and return the new JWKS."""
+        key_ring.rotate()
+        return key_ring.jwks
+
+    return app
+
+
+def server() -> None:
+    """Run the fake identity provider ASGI server."""
+    import uvicorn  # imported lazily: only needed to run the server, not to load the application
+
+    settings = get_identity_provider_settings()
+    uvicorn.run(
+        "library_api.testing.identity_provider:create_app",
+        factory=True,
+        host=settings.host,
+        port=settings.port,
+        server_header=False,
+    )
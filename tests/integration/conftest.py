@@ -6,9 +6,9 @@ from typing import Mapping, Tuple
 
 import jwt as pyjwt
 import pytest
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
-from jwt.algorithms import RSAAlgorithm
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes
+from jwt.algorithms import ECAlgorithm, OKPAlgorithm, RSAAlgorithm
 from jwt.types import JWKDict
 from pydantic import ConfigDict, BaseModel
 from pytest_httpx import HTTPXMock
@@ -30,29 +30,45 @@ class JWK(BaseModel):
     model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
 
     key_id: str
+    algorithm: str
     public_key: JWKDict
-    private_key: RSAPrivateKey
+    private_key: PrivateKeyTypes
 
     @property
-    def to_jwk(self) -> Mapping[str, list[Mapping[str, str]]]:
+    def to_jwk(self) -> Mapping[str, str]:
         """Get the public key as a JSON Web Key dictionary."""
         return {
-            "keys": [
-                {
-                    "kid": self.key_id,
-                    **self.public_key,
-                }
-            ]
+            "kid": self.key_id,
+            "alg": self.algorithm,
+            **self.public_key,
         }
 
 
 @pytest.fixture(scope="package")
 def jwk(jwk_kid: str) -> JWK:
-    """Generate a Json Web Key."""
+    """Generate a RS256 Json Web Key."""
     private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
     public_key = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
 
-    return JWK(key_id=jwk_kid, public_key=public_key, private_key=private_key)
+    return JWK(key_id=jwk_kid, algorithm="RS256", public_key=public_key, private_key=private_key)
+
+
+@pytest.fixture(scope="package")
+def ec_jwk() -> JWK:
+    """Generate a ES256 Json Web Key."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_key = ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+
+    return JWK(key_id=str(uuid.uuid4()), algorithm="ES256", public_key=public_key, private_key=private_key)
+
+
+@pytest.fixture(scope="package")
+def ed25519_jwk() -> JWK:
+    """Generate an EdDSA Json Web Key."""
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    public_key = OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+
+    return JWK(key_id=str(uuid.uuid4()), algorithm="EdDSA", public_key=public_key, private_key=private_key)
 
 
 def craft_jwt(
@@ -92,18 +108,18 @@ def craft_jwt(
             "azp": jwt.authorized_party,
             "permissions": [permission.value for permission in jwt.permissions],
         },
-        algorithm="RS256",
-        key=jwk.private_key,
+        algorithm=jwk.algorithm,
+        key=jwk.private_key,  # pyright: ignore [reportArgumentType]
     )
 
 
 @pytest.fixture(name="auth_client", scope="function")
-def auth_client(httpx_mock: HTTPXMock, jwk: JWK) -> HTTPXMock:
-    """Mock the Auth0 client to return the JWK."""
+def auth_client(httpx_mock: HTTPXMock, jwk: JWK, ec_jwk: JWK, ed25519_jwk: JWK) -> HTTPXMock:
+    """Mock the Auth0 client to return the JWKs."""
     httpx_mock.add_response(
         url="https://fabien-sh.eu.auth0.com/.well-known/jwks.json",
         status_code=200,
-        json=jwk.to_jwk,
+        json={"keys": [jwk.to_jwk, ec_jwk.to_jwk, ed25519_jwk.to_jwk]},
         is_optional=True,
     )
     return httpx_mock
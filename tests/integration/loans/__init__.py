@@ -0,0 +1 @@
+"""Loans integration tests package."""
@@ -0,0 +1,15 @@
+"""Pytest configuration for loans integration tests."""
+
+from typing import Iterator
+
+import pytest
+
+from library_api.api.repositories import fake_loan_repository
+
+
+@pytest.fixture(autouse=True)
+def _empty_loan_repository() -> Iterator[None]:
+    """Delete every loan created during a test so books are available again."""
+    yield
+    for loan in fake_loan_repository.list_all():
+        fake_loan_repository.delete(loan.id)
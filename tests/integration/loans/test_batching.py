@@ -0,0 +1,169 @@
+"""Integration tests for the group commit of the loan mutations."""
+
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Sequence
+
+import pytest
+from fastapi import HTTPException
+
+from library_api.api.batching import LoanWriteBatcher
+from library_api.api.repositories import BOOK_IDS, InMemoryLoanRepository, fake_book_repository
+from library_api.domain.models import ApproveLoan, Loan, LoanMutation, LoanStatus, RequestLoan
+
+caller: ContextVar[str] = ContextVar("caller")
+
+
+def _repository() -> InMemoryLoanRepository:
+    """Create an empty loan repository."""
+    return InMemoryLoanRepository(fake_book_repository, request_ttl=timedelta(days=2), loan_duration=timedelta(weeks=3))
+
+
+async def _submit(batcher: LoanWriteBatcher, mutation: RequestLoan | ApproveLoan, name: str) -> Loan:
+    """Submit a mutation on behalf of a caller."""
+    caller.set(name)
+    return await batcher.submit(mutation)
+
+
+def test_mutations_within_the_window_are_committed_together() -> None:
+    """Test concurrent mutations are committed in a single batch, each caller getting its own loan."""
+    repository = _repository()
+    batcher = LoanWriteBatcher(repository, window=0.01, max_size=64)
+
+    async def request_loans() -> list[Loan]:
+        return await asyncio.gather(
+            *(batcher.submit(RequestLoan(book_id=book_id, user_id=str(book_id))) for book_id in BOOK_IDS)
+        )
+
+    loans = asyncio.run(request_loans())
+
+    assert [loan.book_id for loan in loans] == BOOK_IDS
+    assert repository.snapshot().version == 1
+
+
+def test_one_active_loan_per_book_within_a_batch() -> None:
+    """Test a second request for the same book in the same batch is rejected, in arrival order."""
+    batcher = LoanWriteBatcher(_repository(), window=0.01, max_size=64)
+
+    async def request_loans() -> tuple[Loan | BaseException, Loan | BaseException]:
+        return await asyncio.gather(
+            batcher.submit(RequestLoan(book_id=BOOK_IDS[0], user_id="first")),
+            batcher.submit(RequestLoan(book_id=BOOK_IDS[0], user_id="second")),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(request_loans())
+
+    assert isinstance(first, Loan) and first.user_id == "first"
+    assert isinstance(second, HTTPException) and second.status_code == 409
+
+
+def test_mutations_of_a_batch_are_applied_in_order() -> None:
+    """Test the mutations of a batch are applied in order: a loan approved twice in a batch is approved once."""
+    repository = _repository()
+    requested = repository.request(BOOK_IDS[0], "user")
+    batcher = LoanWriteBatcher(repository, window=0.01, max_size=64)
+
+    async def approve_twice() -> tuple[Loan | BaseException, Loan | BaseException]:
+        return await asyncio.gather(
+            batcher.submit(ApproveLoan(loan_id=requested.id)),
+            batcher.submit(ApproveLoan(loan_id=requested.id)),
+            return_exceptions=True,
+        )
+
+    approved, again = asyncio.run(approve_twice())
+
+    assert isinstance(approved, Loan) and approved.status == LoanStatus.APPROVED
+    assert isinstance(again, HTTPException) and again.status_code == 400
+
+
+def test_full_batch_is_committed_without_waiting_for_the_window() -> None:
+    """Test a batch reaching its maximum size is committed right away."""
+    batcher = LoanWriteBatcher(_repository(), window=60, max_size=2)
+
+    async def request_loans() -> tuple[Loan, Loan]:
+        return await asyncio.wait_for(
+            asyncio.gather(
+                batcher.submit(RequestLoan(book_id=BOOK_IDS[0], user_id="user")),
+                batcher.submit(RequestLoan(book_id=BOOK_IDS[1], user_id="user")),
+            ),
+            timeout=1,
+        )
+
+    assert len(asyncio.run(request_loans())) == 2
+
+
+@pytest.mark.parametrize("window", [0, 0.01])
+def test_listeners_are_notified_in_the_context_of_each_caller(window: float) -> None:
+    """Test the repository listeners see the context of the caller of each mutation."""
+    repository = _repository()
+    notified: list[tuple[str, str]] = []
+    repository.subscribe(lambda loan: notified.append((loan.user_id, caller.get())))
+    batcher = LoanWriteBatcher(repository, window=window, max_size=64)
+
+    async def request_loans() -> None:
+        await asyncio.gather(
+            _submit(batcher, RequestLoan(book_id=BOOK_IDS[0], user_id="alice"), "alice"),
+            _submit(batcher, RequestLoan(book_id=BOOK_IDS[1], user_id="bob"), "bob"),
+        )
+
+    asyncio.run(request_loans())
+
+    assert notified == [("alice", "alice"), ("bob", "bob")]
+
+
+def test_commits_run_off_the_loop_one_at_a_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the loop keeps running during a commit, and the mutations submitted meanwhile form the next batch."""
+    repository = _repository()
+    commit = repository.commit
+    batches: list[int] = []
+    committing = threading.Lock()
+
+    def slow_commit(mutations: Sequence[LoanMutation]) -> list[Loan | Exception]:
+        assert committing.acquire(blocking=False), "commits overlap"
+        try:
+            batches.append(len(mutations))
+            time.sleep(0.05)
+            return commit(mutations)
+        finally:
+            committing.release()
+
+    monkeypatch.setattr(repository, "commit", slow_commit)
+    batcher = LoanWriteBatcher(repository, window=0, max_size=64)
+
+    async def request_loans() -> int:
+        first = asyncio.ensure_future(batcher.submit(RequestLoan(book_id=BOOK_IDS[0], user_id="user")))
+        ticks = 0
+        while not batches:
+            await asyncio.sleep(0.001)
+        others = [
+            asyncio.ensure_future(batcher.submit(RequestLoan(book_id=book_id, user_id="user")))
+            for book_id in BOOK_IDS[1:]
+        ]
+        while not first.done():
+            ticks += 1
+            await asyncio.sleep(0.001)
+        await asyncio.gather(*others)
+        return ticks
+
+    assert asyncio.run(request_loans()) > 5
+    assert batches == [1, 2]
+    assert repository.snapshot().version == 2
+
+
+def test_drain_commits_the_pending_mutations() -> None:
+    """Test draining commits the pending mutations without waiting for the window, e.g. on shutdown."""
+    repository = _repository()
+    batcher = LoanWriteBatcher(repository, window=60, max_size=64)
+
+    async def request_and_drain() -> Loan:
+        requested = asyncio.ensure_future(batcher.submit(RequestLoan(book_id=BOOK_IDS[0], user_id="user")))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(batcher.drain(), timeout=1)
+        return await requested
+
+    assert asyncio.run(request_and_drain()).book_id == BOOK_IDS[0]
+    assert repository.snapshot().version == 1
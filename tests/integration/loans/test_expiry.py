@@ -0,0 +1,106 @@
+"""Integration tests for the loans expiry."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from library_api.api.repositories import BOOK_IDS, InMemoryLoanRepository, fake_book_repository, fake_loan_repository
+from library_api.api.scheduling import LoanExpiryScheduler
+from library_api.api.security import Permission
+from library_api.domain.models import LoanStatus
+from tests.integration.conftest import craft_jwt, JWK
+
+
+class FakeClock:
+    """Clock moved forward on demand."""
+
+    def __init__(self) -> None:
+        """Initialize the clock at the current date."""
+        self.now = datetime.now(tz=timezone.utc)
+
+    def __call__(self) -> datetime:
+        """Get the current date of the clock."""
+        return self.now
+
+
+def test_expired_request_is_cancelled() -> None:
+    """Test a loan request not approved before it expires is cancelled and releases its book."""
+    repository = InMemoryLoanRepository(
+        fake_book_repository, request_ttl=timedelta(days=2), loan_duration=timedelta(weeks=3)
+    )
+    clock = FakeClock()
+    scheduler = LoanExpiryScheduler(repository, clock=clock)
+    repository.subscribe(scheduler.schedule)
+    loan = repository.request(BOOK_IDS[0], "user")
+
+    clock.now += timedelta(days=1)
+    assert scheduler.expire_due() == loan.request_expires_at
+    assert repository.get_by_id(loan.id).status == LoanStatus.REQUESTED  # pyright: ignore [reportOptionalMemberAccess]
+
+    clock.now += timedelta(days=2)
+    assert scheduler.expire_due() is None
+    assert repository.get_by_id(loan.id).status == LoanStatus.CANCELLED  # pyright: ignore [reportOptionalMemberAccess]
+    assert repository.request(BOOK_IDS[0], "other user").status == LoanStatus.REQUESTED
+
+
+def test_approved_loan_past_due_date_is_overdue() -> None:
+    """Test an approved loan is flagged overdue once its due date passed, and not cancelled by its request expiry."""
+    repository = InMemoryLoanRepository(
+        fake_book_repository, request_ttl=timedelta(days=2), loan_duration=timedelta(weeks=3)
+    )
+    clock = FakeClock()
+    scheduler = LoanExpiryScheduler(repository, clock=clock)
+    repository.subscribe(scheduler.schedule)
+    loan = repository.approve(repository.request(BOOK_IDS[0], "user").id)
+
+    clock.now += timedelta(days=3)
+    scheduler.expire_due()
+    assert repository.list_overdue() == []
+
+    clock.now += timedelta(weeks=3)
+    scheduler.expire_due()
+    assert [overdue.id for overdue in repository.list_overdue()] == [loan.id]
+    assert repository.get_by_id(loan.id).status == LoanStatus.APPROVED  # pyright: ignore [reportOptionalMemberAccess]
+
+
+def test_scheduler_runs_in_the_background() -> None:
+    """Test the running scheduler expires a loan as soon as its deadline passes."""
+    repository = InMemoryLoanRepository(
+        fake_book_repository, request_ttl=timedelta(0), loan_duration=timedelta(weeks=3)
+    )
+
+    async def request_and_wait() -> LoanStatus:
+        async with LoanExpiryScheduler(repository).running():
+            loan = repository.request(BOOK_IDS[0], "user")
+            await asyncio.sleep(0.05)
+            return repository.get_by_id(loan.id).status  # pyright: ignore [reportOptionalMemberAccess]
+
+    assert asyncio.run(request_and_wait()) == LoanStatus.CANCELLED
+
+
+def test_list_overdue_loans(client: TestClient, jwk: JWK) -> None:
+    """Test the overdue loans are listed."""
+    loan = fake_loan_repository.approve(fake_loan_repository.request(BOOK_IDS[0], "user").id)
+    fake_loan_repository.expire(loan.id, now=loan.due_at + timedelta(seconds=1))  # pyright: ignore [reportOptionalOperand]
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_READ_ALL})
+
+    response = client.get("/loans/overdue", headers={"Authorization": f"Bearer {raw_jwt}"})
+
+    assert response.status_code == 200
+    assert [overdue["id"] for overdue in response.json()] == [str(loan.id)]
+    assert response.json()[0]["overdue"] is True
+
+
+def test_listeners_are_notified_of_expiries_without_the_write_lock() -> None:
+    """Test a listener notified of an expiry does not hold up the writes of the repository."""
+    repository = InMemoryLoanRepository(
+        fake_book_repository, request_ttl=timedelta(days=2), loan_duration=timedelta(weeks=3)
+    )
+    loan = repository.request(BOOK_IDS[0], "user")
+    writable: list[bool] = []
+    repository.subscribe(lambda _: writable.append(not repository._lock.locked()))
+
+    repository.expire(loan.id, now=loan.request_expires_at)
+
+    assert writable == [True]
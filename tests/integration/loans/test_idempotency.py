@@ -0,0 +1,64 @@
+"""Integration tests for idempotency keys on loan mutations."""
+
+import uuid
+
+from fastapi.testclient import TestClient
+
+from library_api.api.repositories import BOOK_IDS, fake_loan_repository
+from library_api.api.security import Permission
+from tests.integration.conftest import craft_jwt, JWK
+
+
+def test_retried_loan_request_is_replayed(client: TestClient, jwk: JWK) -> None:
+    """Test a loan request retried with the same idempotency key returns the first response."""
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_REQUEST})
+    headers = {"Authorization": f"Bearer {raw_jwt}", "Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers=headers)
+    retry = client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert len(fake_loan_repository.list_all()) == 1
+
+
+def test_loan_request_without_idempotency_key_conflicts(client: TestClient, jwk: JWK) -> None:
+    """Test a loan request retried without idempotency key returns an HTTP/409."""
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_REQUEST})
+    headers = {"Authorization": f"Bearer {raw_jwt}"}
+
+    first = client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers=headers)
+    retry = client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.status_code == 409
+
+
+def test_idempotency_key_reused_for_another_payload(client: TestClient, jwk: JWK) -> None:
+    """Test an idempotency key reused with a different payload returns an HTTP/422."""
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_REQUEST})
+    headers = {"Authorization": f"Bearer {raw_jwt}", "Idempotency-Key": str(uuid.uuid4())}
+
+    first = client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers=headers)
+    other = client.post("/loans/", json={"book_id": str(BOOK_IDS[1])}, headers=headers)
+
+    assert first.status_code == 200
+    assert other.status_code == 422
+    assert len(fake_loan_repository.list_all()) == 1
+
+
+def test_retried_loan_approval_is_replayed(client: TestClient, jwk: JWK) -> None:
+    """Test a loan approval retried with the same idempotency key returns the first response."""
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_REQUEST, Permission.LOAN_APPROVE})
+    headers = {"Authorization": f"Bearer {raw_jwt}"}
+    loan = client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers=headers).json()
+
+    headers["Idempotency-Key"] = str(uuid.uuid4())
+    first = client.post("/loans/approve", json={"loan_id": loan["id"]}, headers=headers)
+    fake_loan_repository.delete(uuid.UUID(loan["id"]))
+    retry = client.post("/loans/approve", json={"loan_id": loan["id"]}, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
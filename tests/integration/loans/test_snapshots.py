@@ -0,0 +1,82 @@
+"""Integration tests for the loan snapshots."""
+
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from library_api.api.persistent import PersistentMap
+from library_api.api.repositories import BOOK_IDS, InMemoryLoanRepository, fake_book_repository, fake_loan_repository
+from library_api.api.security import Permission
+from library_api.domain.models import LoanStatus
+from tests.integration.conftest import craft_jwt, JWK
+
+
+def test_snapshot_is_isolated_from_mutations() -> None:
+    """Test a snapshot keeps a consistent view while loans are requested and approved."""
+    repository = InMemoryLoanRepository(
+        fake_book_repository, request_ttl=timedelta(days=2), loan_duration=timedelta(weeks=3)
+    )
+    requested = repository.request(BOOK_IDS[0], "user")
+    snapshot = repository.snapshot()
+
+    repository.approve(requested.id)
+    repository.request(BOOK_IDS[1], "user")
+
+    assert tuple(snapshot.ordered) == (requested,)
+    assert snapshot.loans[str(requested.id)].status == LoanStatus.REQUESTED
+    assert repository.snapshot().version == snapshot.version + 2
+    assert [loan.status for loan in repository.list_all()] == [LoanStatus.APPROVED, LoanStatus.REQUESTED]
+
+
+def test_returned_book_can_be_requested_again() -> None:
+    """Test the index of the active loans frees a book once its loan is returned."""
+    repository = InMemoryLoanRepository(
+        fake_book_repository, request_ttl=timedelta(days=2), loan_duration=timedelta(weeks=3)
+    )
+    loan = repository.approve(repository.request(BOOK_IDS[0], "user").id)
+
+    with pytest.raises(HTTPException) as error:
+        repository.request(BOOK_IDS[0], "other")
+    assert error.value.status_code == 409
+
+    repository.return_(loan.id)
+    assert repository.request(BOOK_IDS[0], "other").user_id == "other"
+
+
+def test_persistent_map_versions_are_isolated() -> None:
+    """Test updates of a persistent map, compactions included, leave its previous versions untouched."""
+    versions = [PersistentMap[int, int]()]
+    for key in range(500):
+        versions.append(versions[-1].set(key, key))
+    for key in range(0, 500, 2):
+        versions.append(versions[-1].remove(key).set(key, -key))
+
+    assert list(versions[500].items()) == [(key, key) for key in range(500)]
+    assert list(versions[-1]) == list(range(1, 500, 2)) + list(range(0, 500, 2))
+    assert versions[-1][42] == -42
+    assert len(versions[-1]) == 500
+    assert 500 not in versions[-1]
+
+
+def test_all_loans_are_listed_in_order(client: TestClient, jwk: JWK) -> None:
+    """Test every loan of the current snapshot is listed, in insertion order."""
+    loans = [fake_loan_repository.request(book_id, "user") for book_id in BOOK_IDS]
+    fake_loan_repository.approve(loans[0].id)
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_READ_ALL})
+
+    response = client.get("/loans/", headers={"Authorization": f"Bearer {raw_jwt}"})
+
+    assert response.status_code == 200
+    assert [loan["id"] for loan in response.json()] == [str(loan.id) for loan in [*loans[1:], loans[0]]]
+
+
+def test_persistent_map_values_sequence() -> None:
+    """Test the values of a persistent map are read in insertion order, skipping the removed ones."""
+    values = PersistentMap[int, str]().set(1, "a").set(2, "b").set(3, "c").remove(2).ordered_values()
+
+    assert list(values) == ["a", "c"]
+    assert (len(values), values[1], values[-1], values[:1]) == (2, "c", "c", ("a",))
+    with pytest.raises(IndexError):
+        values[2]
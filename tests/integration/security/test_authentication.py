@@ -6,6 +6,7 @@ import pytest
 from fastapi import Depends
 from fastapi.testclient import TestClient
 
+from library_api.api.config import AuthenticationSettings, get_auth_settings
 from library_api.api.kernel import app
 from library_api.api.security import Permission, JWT
 from library_api.api.security.authentication import authentication
@@ -52,3 +53,31 @@ def test_valid_jwt(client: TestClient, jwk: JWK) -> None:
     assert body["expires_at"] == jwt.expires_at.strftime("%Y-%m-%dT%H:%M:%SZ")
     assert body["authorized_party"] == jwt.authorized_party
     assert body["permissions"] == [Permission.BOOK_READ]
+
+
+@pytest.mark.parametrize("key", ["jwk", "ec_jwk", "ed25519_jwk"])
+def test_valid_jwt_per_algorithm(client: TestClient, key: str, request: pytest.FixtureRequest) -> None:
+    """Test a JWT signed with any allowed algorithm is authenticated."""
+    jwk: JWK = request.getfixturevalue(key)
+    jwt, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.BOOK_READ})
+    response = client.get("/test/authn", headers={"Authorization": f"Bearer {raw_jwt}"})
+    assert response.status_code == 200
+    assert response.json()["subject"] == jwt.subject
+
+
+def test_algorithm_not_allowed(client: TestClient, ec_jwk: JWK) -> None:
+    """Test a JWT signed with a key whose algorithm is not allowed returns an HTTP/401."""
+    _, raw_jwt = craft_jwt(jwk=ec_jwk)
+    app.dependency_overrides[get_auth_settings] = lambda: AuthenticationSettings(algorithms=("RS256",))
+    try:
+        response = client.get("/test/authn", headers={"Authorization": f"Bearer {raw_jwt}"})
+    finally:
+        del app.dependency_overrides[get_auth_settings]
+    assert response.status_code == 401
+
+
+def test_algorithm_mismatching_the_key(client: TestClient, jwk: JWK, ec_jwk: JWK) -> None:
+    """Test a JWT whose algorithm does not match the key found for its kid returns an HTTP/401."""
+    _, raw_jwt = craft_jwt(jwk=JWK(key_id=jwk.key_id, algorithm="ES256", public_key={}, private_key=ec_jwk.private_key))
+    response = client.get("/test/authn", headers={"Authorization": f"Bearer {raw_jwt}"})
+    assert response.status_code == 401
@@ -0,0 +1,155 @@
+"""Integration tests for the cache shared by the workers of a host."""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from pytest_httpx import HTTPXMock
+
+from library_api.api.caching import SharedCache, get_shared_cache
+from library_api.api.config import SharedCacheSettings, get_shared_cache_settings
+from library_api.api.kernel import app
+from library_api.api.security import Permission
+from library_api.api.security.authentication import _get_json_web_key
+from tests.integration.conftest import craft_jwt, JWK
+
+JWKS_URL = "https://fabien-sh.eu.auth0.com/.well-known/jwks.json"
+
+
+@pytest.fixture(name="shared_cache")
+def shared_cache(tmp_path: Path) -> Iterator[SharedCache]:
+    """Enable a shared cache, with verified tokens, backed by a temporary file."""
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    app.dependency_overrides[get_shared_cache] = lambda: cache
+    app.dependency_overrides[get_shared_cache_settings] = lambda: SharedCacheSettings(
+        path=cache.path, verified_tokens=True
+    )
+    _get_json_web_key.cache_clear()  # pyright: ignore [reportFunctionMemberAccess]
+    yield cache
+    del app.dependency_overrides[get_shared_cache]
+    del app.dependency_overrides[get_shared_cache_settings]
+    _get_json_web_key.cache_clear()  # pyright: ignore [reportFunctionMemberAccess]
+
+
+def _jwks_requests(httpx_mock: HTTPXMock) -> int:
+    """Count the requests made to the JWKS endpoint."""
+    return len(httpx_mock.get_requests(url=JWKS_URL))
+
+
+def test_jwks_fetched_once_per_host(
+    client: TestClient, auth_client: HTTPXMock, jwk: JWK, shared_cache: SharedCache
+) -> None:
+    """Test workers with a cold in-process cache reuse the JWKS fetched by another worker."""
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.BOOK_READ})
+    assert client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"}).status_code == 200
+
+    _get_json_web_key.cache_clear()  # pyright: ignore [reportFunctionMemberAccess]
+    _, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_READ})
+    assert client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"}).status_code == 200
+
+    assert _jwks_requests(auth_client) == 1
+
+
+def test_verified_token_is_cached(
+    client: TestClient, auth_client: HTTPXMock, jwk: JWK, shared_cache: SharedCache
+) -> None:
+    """Test a verified token is served from the shared cache."""
+    jwt, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.BOOK_READ})
+    client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"})
+
+    response = client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"})
+
+    assert response.status_code == 200
+    assert response.json()["subject"] == jwt.subject
+    jwks = shared_cache.get("jwks")
+    assert jwks is not None
+    assert len(jwks["keys"]) == 3
+
+
+def test_key_rotation_bumps_version(
+    client: TestClient, auth_client: HTTPXMock, jwk: JWK, ec_jwk: JWK, shared_cache: SharedCache
+) -> None:
+    """Test an unknown key ID refreshes the shared JWKS once and invalidates the cache of every worker."""
+    shared_cache.set("jwks", {"keys": [jwk.to_jwk]}, ttl=3600)
+    app.dependency_overrides[get_shared_cache_settings] = lambda: SharedCacheSettings(
+        path=shared_cache.path, jwks_min_refresh_interval=0
+    )
+
+    for _ in range(3):
+        _, raw_jwt = craft_jwt(jwk=ec_jwk)
+        assert client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"}).status_code == 200
+
+    assert shared_cache.version() == 1
+    assert _jwks_requests(auth_client) == 1
+
+
+def test_unknown_key_refresh_is_rate_limited(
+    client: TestClient, auth_client: HTTPXMock, jwk: JWK, shared_cache: SharedCache
+) -> None:
+    """Test tokens with unknown key IDs do not refresh the shared JWKS more than once per interval."""
+    for kid in ["unknown-1", "unknown-2", "unknown-3"]:
+        _, raw_jwt = craft_jwt(jwk=JWK(key_id=kid, algorithm=jwk.algorithm, public_key={}, private_key=jwk.private_key))
+        assert client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"}).status_code == 401
+
+    assert _jwks_requests(auth_client) == 1
+    assert shared_cache.version() == 0
+
+
+def test_value_computed_without_blocking_writes(shared_cache: SharedCache) -> None:
+    """Test workers missing a value compute it once, without holding the write lock of the host meanwhile."""
+    calls = []
+
+    def fetch() -> dict[str, int]:
+        calls.append(None)
+        shared_cache.set("unrelated", 1, ttl=60)
+        time.sleep(0.05)
+        return {"keys": 1}
+
+    threads = [threading.Thread(target=shared_cache.get_or_set, args=("jwks", fetch, 60)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert shared_cache.get("jwks") == {"keys": 1}
+    assert shared_cache.get("unrelated") == 1
+
+
+def test_expired_entries_evicted_periodically(tmp_path: Path) -> None:
+    """Test expired entries are evicted every few writes rather than on every write."""
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), eviction_interval=3)
+    cache.set("expired", 1, ttl=-1)
+    cache.set("other", 2, ttl=60)
+
+    def entries() -> int:
+        return cache._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    assert entries() == 2
+    cache.set("another", 3, ttl=60)
+    assert entries() == 2
+
+
+@pytest.mark.parametrize("mode", [0o644, 0o660])
+def test_file_accessible_to_others_rejected(tmp_path: Path, mode: int) -> None:
+    """Test a cache file others could have tampered with is not trusted."""
+    path = tmp_path / "cache.sqlite3"
+    path.touch()
+    path.chmod(mode)
+
+    with pytest.raises(PermissionError):
+        SharedCache(str(path))
+
+
+def test_directory_writable_by_others_rejected(tmp_path: Path) -> None:
+    """Test a cache in a directory where others could plant its WAL files is not trusted."""
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    os.chmod(directory, 0o1777)
+
+    with pytest.raises(PermissionError):
+        SharedCache(str(directory / "cache.sqlite3"))
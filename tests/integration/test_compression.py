@@ -0,0 +1,114 @@
+"""Integration tests for the responses compression."""
+
+import asyncio
+import gzip
+import zlib
+from typing import Iterator
+
+import pytest
+import zstandard
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from starlette.types import Message
+
+from library_api.api.compression import CompressionMiddleware, negotiate_encoding
+
+BODY = "loan " * 1000
+
+
+def _stream() -> Iterator[bytes]:
+    """Stream the body in chunks."""
+    for _ in range(10):
+        yield BODY.encode()
+
+
+app = Starlette(
+    routes=[
+        Route("/big", lambda _: PlainTextResponse(BODY)),
+        Route("/small", lambda _: PlainTextResponse("loan")),
+        Route("/auth/big", lambda _: PlainTextResponse(BODY)),
+        Route("/forbidden", lambda _: JSONResponse({"detail": BODY}, status_code=403)),
+        Route("/stream", lambda _: StreamingResponse(_stream(), media_type="text/plain")),
+    ]
+)
+app.add_middleware(
+    CompressionMiddleware,  # pyright: ignore [reportArgumentType]
+    minimum_size=1024,
+    gzip_level=6,
+    zstd_level=3,
+    excluded_paths=("/auth/",),
+)
+client = TestClient(app)
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "encoding"),
+    [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip", "gzip"),
+        ("gzip;q=1, zstd;q=0.5", "gzip"),
+        ("zstd;q=0, *", "gzip"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, encoding: str | None) -> None:
+    """Test the preferred supported encoding is negotiated."""
+    assert negotiate_encoding(accept_encoding) == encoding
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_large_response_is_compressed(encoding: str) -> None:
+    """Test a response larger than the minimum size is compressed with the negotiated encoding."""
+    response = client.get("/big", headers={"Accept-Encoding": encoding})
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(BODY)
+    assert response.text == BODY
+
+
+@pytest.mark.parametrize("path", ["/small", "/auth/big", "/forbidden"])
+def test_response_is_not_compressed(path: str) -> None:
+    """Test small responses, excluded paths and authorization errors are not compressed."""
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streamed_response_is_compressed_chunk_by_chunk() -> None:
+    """Test each chunk of a streamed response is compressed and flushed on its own."""
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/stream",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "query_string": b"",
+    }
+    asyncio.run(app(scope, receive, send))  # pyright: ignore [reportArgumentType]
+
+    headers = dict(messages[0]["headers"])
+    chunks = [message["body"] for message in messages[1:] if message["body"]]
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert len(chunks) == 10 + 1  # the last message only carries the gzip trailer
+    assert zlib.decompressobj(wbits=zlib.MAX_WBITS | 16).decompress(chunks[0]) == BODY.encode()
+    assert gzip.decompress(b"".join(chunks)).decode() == BODY * 10
+
+
+def test_streamed_response_is_compressed_with_zstd() -> None:
+    """Test a streamed response compressed with zstd is a valid zstd stream."""
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "zstd"}) as response:
+        body = b"".join(response.iter_raw())
+
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(body).decode() == BODY * 10
@@ -0,0 +1,128 @@
+"""Integration tests for the access and audit logs."""
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from library_api.api.config import LoggingSettings
+from library_api.api.logs import NonBlockingQueueHandler, access_logger, audit_loan, logging_pipeline
+from library_api.api.repositories import BOOK_IDS, fake_loan_repository
+from library_api.api.security import Permission
+from tests.integration.conftest import craft_jwt, JWK
+
+
+@pytest.fixture(name="audited")
+def audited() -> Iterator[None]:
+    """Audit the loan transitions and delete the loans created during the test."""
+    unsubscribe = fake_loan_repository.subscribe(audit_loan)
+    yield
+    unsubscribe()
+    for loan in fake_loan_repository.list_all():
+        fake_loan_repository.delete(loan.id)
+
+
+def _record(level: int, name: str) -> logging.LogRecord:
+    """Create a log record."""
+    return logging.LogRecord(name, level, __file__, 0, "message", None, None)
+
+
+def test_access_log(client: TestClient, jwk: JWK, caplog: pytest.LogCaptureFixture) -> None:
+    """Test a request is logged with its status, duration and authenticated subject."""
+    jwt, raw_jwt = craft_jwt(jwk=jwk)
+
+    with caplog.at_level(logging.INFO, logger="library_api"):
+        client.get("/auth/introspection", headers={"Authorization": f"Bearer {raw_jwt}"})
+
+    [record] = [record for record in caplog.records if record.name == "library_api.access"]
+    fields = record.fields  # pyright: ignore [reportAttributeAccessIssue]
+    assert fields["path"] == "/auth/introspection"
+    assert fields["status"] == 200
+    assert fields["subject"] == jwt.subject
+    assert fields["duration_ms"] > 0
+
+
+def test_audit_log(client: TestClient, jwk: JWK, caplog: pytest.LogCaptureFixture, audited: None) -> None:
+    """Test a loan transition is audited along with the subject who made it."""
+    jwt, raw_jwt = craft_jwt(jwk=jwk, permissions={Permission.LOAN_REQUEST})
+
+    with caplog.at_level(logging.INFO, logger="library_api"):
+        client.post("/loans/", json={"book_id": str(BOOK_IDS[0])}, headers={"Authorization": f"Bearer {raw_jwt}"})
+
+    [record] = [record for record in caplog.records if record.name == "library_api.audit"]
+    fields = record.fields  # pyright: ignore [reportAttributeAccessIssue]
+    assert fields["actor"] == jwt.subject
+    assert fields["book_id"] == BOOK_IDS[0]
+    assert fields["status"] == "requested"
+
+
+def test_full_queue_drops_records() -> None:
+    """Test access records are dropped rather than blocking once the queue is full."""
+    handler = NonBlockingQueueHandler(queue_size=2, overload_policy="drop", sample_rate=0, sample_watermark=0)
+
+    for _ in range(5):
+        handler.handle(_record(logging.INFO, "library_api.access"))
+
+    assert handler.queue.qsize() == 2  # pyright: ignore [reportAttributeAccessIssue]
+    assert handler.dropped == 3
+
+
+def test_audit_records_are_kept_past_a_full_queue() -> None:
+    """Test audit records have their own slots once the queue is full of access records, and never wait for one."""
+    handler = NonBlockingQueueHandler(
+        queue_size=2, overload_policy="drop", sample_rate=0, sample_watermark=0, audit_queue_size=3
+    )
+
+    for _ in range(3):
+        handler.handle(_record(logging.INFO, "library_api.access"))
+    start = time.perf_counter()
+    for _ in range(4):
+        handler.handle(_record(logging.INFO, "library_api.audit"))
+
+    assert time.perf_counter() - start < 0.1
+
+    assert handler.queue.qsize() == 5  # pyright: ignore [reportAttributeAccessIssue]
+    assert (handler.dropped, handler.dropped_audit) == (2, 1)
+
+
+def test_dropped_records_are_reported(tmp_path: Path) -> None:
+    """Test the number of dropped records is logged by the background thread."""
+    path = tmp_path / "library-api.log"
+
+    with logging_pipeline(LoggingSettings(path=str(path))) as handler:
+        handler.dropped, handler.dropped_audit = 3, 1
+        access_logger.info("GET / 200")
+
+    *_, report = [json.loads(line) for line in path.read_text().splitlines()]
+    assert report["level"] == "ERROR"
+    assert (report["dropped"], report["dropped_audit"]) == (3, 1)
+
+
+def test_access_logs_are_sampled_past_the_watermark() -> None:
+    """Test access logs are sampled past the watermark while audit logs are kept."""
+    handler = NonBlockingQueueHandler(queue_size=10, overload_policy="sample", sample_rate=0, sample_watermark=0.5)
+
+    for _ in range(10):
+        handler.handle(_record(logging.INFO, "library_api.access"))
+    for _ in range(3):
+        handler.handle(_record(logging.INFO, "library_api.audit"))
+
+    assert handler.queue.qsize() == 8  # pyright: ignore [reportAttributeAccessIssue]
+    assert handler.dropped == 5
+
+
+def test_logging_pipeline_writes_json_lines(tmp_path: Path) -> None:
+    """Test the logs are written as JSON lines by the background thread."""
+    path = tmp_path / "library-api.log"
+
+    with logging_pipeline(LoggingSettings(path=str(path))):
+        access_logger.info("GET / 200", extra={"fields": {"status": 200}})
+
+    line = json.loads(path.read_text())
+    assert line["logger"] == "library_api.access"
+    assert line["message"] == "GET / 200"
+    assert line["status"] == 200
@@ -0,0 +1 @@
+"""Testing tooling integration tests package."""
@@ -0,0 +1,40 @@
+"""Integration tests for the fake identity provider."""
+
+import jwt as pyjwt
+import pytest
+from fastapi.testclient import TestClient
+from jwt import PyJWK
+
+from library_api.api.security import Permission, JWT
+from library_api.testing.identity_provider import IdentityProviderSettings, create_app
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "ES256", "EdDSA"])
+def test_minted_token_is_verified_by_the_jwks(algorithm: str) -> None:
+    """Test a minted token is signed by a key served in the JWKS."""
+    client = TestClient(create_app(IdentityProviderSettings(algorithm=algorithm)))
+
+    raw_jwt = client.post("/oauth/token", json={"permissions": [Permission.LOAN_READ]}).json()["access_token"]
+    jwks = client.get("/.well-known/jwks.json").json()
+
+    json_web_key = PyJWK(jwks["keys"][0])
+    claims = pyjwt.decode(raw_jwt, key=json_web_key.key, audience="library-api", algorithms=[algorithm])
+    assert JWT(**claims).permissions == {Permission.LOAN_READ}
+
+
+def test_key_rotation_retains_previous_keys() -> None:
+    """Test a rotation serves the new key first and keeps the retained previous ones."""
+    client = TestClient(create_app(IdentityProviderSettings(retained_keys=2)))
+    first_kid = client.get("/.well-known/jwks.json").json()["keys"][0]["kid"]
+
+    client.post("/keys/rotate")
+    kids = [key["kid"] for key in client.post("/keys/rotate").json()["keys"]]
+
+    assert len(kids) == 2
+    assert first_kid not in kids
+
+
+def test_jwks_failures() -> None:
+    """Test the JWKS endpoint fails with an HTTP/503 according to the failure rate."""
+    client = TestClient(create_app(IdentityProviderSettings(jwks_failure_rate=1)))
+    assert client.get("/.well-known/jwks.json").status_code == 503